@@ -0,0 +1,111 @@
+"""
+Synthetic wave generator for the benchmarks.
+
+Builds a folder tree with the same layout main.py expects (one folder per
+university code, holding 1.txt, 2.txt, ...), filled with generated English-like
+text. Page sizes follow a log-normal distribution around typical diversity pages,
+plus a few msu/byu-style outliers of about 150,000 characters. Every page starts
+and ends with the same navigation/footer boilerplate, a small share of pages is
+copied verbatim into other universities, and a few pages contain non-ASCII text,
+so dedup, boilerplate and UTF-8 code paths get exercised too.
+
+The output only depends on the parameters and the seed, so two runs with the same
+settings produce byte-identical corpora.
+
+Usage:
+    python generate_corpus.py /tmp/bench_wave --universities 300 --max-files 6
+"""
+
+import os
+import math
+import random
+import argparse
+
+WORDS = (
+    "diversity equity inclusion students faculty staff campus office community program support "
+    "belonging mentoring scholarship research center initiative first-generation veterans disability "
+    "services resources training committee council strategic plan climate survey report events "
+    "heritage month cultural identity access opportunity excellence leadership graduate undergraduate "
+    "admissions financial aid housing health counseling wellness library learning teaching"
+).split()
+NON_ASCII_WORDS = ["café", "résumé", "naïve", "Señora", "Zürich", "–", "“quoted”", "…", "日本語", "😊"]
+HEADER = "Home | About | Academics | Admissions | Campus Life | Contact\nSkip to main content\n"
+FOOTER = "\n© 2021 University. All rights reserved. | Privacy | Accessibility | Site Map\n"
+
+
+def make_page(rng, n_chars, non_ascii):
+    """Generate about n_chars characters of paragraph text, wrapped in the shared boilerplate."""
+    words = []
+    length = 0
+    while length < n_chars:
+        word = rng.choice(NON_ASCII_WORDS) if non_ascii and rng.random() < 0.02 else rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+        if rng.random() < 0.01:
+            words.append(".\n\n")  # Paragraph break
+    return HEADER + " ".join(words) + FOOTER
+
+
+def generate_corpus(root, universities=300, max_files=6, median_chars=6000, outlier_rate=0.01,
+                    outlier_chars=150000, duplicate_rate=0.03, seed=2021):
+    """
+    Write a synthetic wave under root and return a summary dict
+    (universities, files, bytes, and the parameters used).
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+
+    # A few real-looking codes first, so the msu/byu outliers have familiar names
+    codes = ["byu", "msu"] + [f"u{i:05d}" for i in range(max(0, universities - 2))]
+    codes = codes[:universities]
+
+    pages_written = []  # Earlier pages that may be copied into later universities
+    total_files = 0
+    total_bytes = 0
+    for code in codes:
+        folder = os.path.join(root, code)
+        os.makedirs(folder, exist_ok=True)
+        for i in range(1, rng.randint(1, max_files) + 1):
+            if pages_written and rng.random() < duplicate_rate:
+                text = rng.choice(pages_written)  # Same page saved under two universities
+            else:
+                outlier = (code in ("byu", "msu") and i == 1) or rng.random() < outlier_rate
+                n_chars = outlier_chars if outlier else int(rng.lognormvariate(math.log(median_chars), 0.8))
+                text = make_page(rng, n_chars, non_ascii=rng.random() < 0.2)
+                if len(pages_written) < 200:
+                    pages_written.append(text)
+            data = text.encode('utf-8')
+            with open(os.path.join(folder, f"{i}.txt"), 'wb') as f:
+                f.write(data)
+            total_files += 1
+            total_bytes += len(data)
+
+    return {
+        "universities": len(codes),
+        "files": total_files,
+        "bytes": total_bytes,
+        "max_files": max_files,
+        "median_chars": median_chars,
+        "outlier_rate": outlier_rate,
+        "outlier_chars": outlier_chars,
+        "duplicate_rate": duplicate_rate,
+        "seed": seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic university wave.")
+    parser.add_argument("root", help="Folder to create the university folders in")
+    parser.add_argument("--universities", type=int, default=300)
+    parser.add_argument("--max-files", type=int, default=6, help="Files per folder are 1..max-files")
+    parser.add_argument("--median-chars", type=int, default=6000)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--outlier-chars", type=int, default=150000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=2021)
+    args = parser.parse_args()
+
+    summary = generate_corpus(args.root, args.universities, args.max_files, args.median_chars,
+                              args.outlier_rate, args.outlier_chars, args.duplicate_rate, args.seed)
+    print(f"Generated {summary['universities']} universities, {summary['files']} files, "
+          f"{summary['bytes']} bytes in {args.root}")
@@ -0,0 +1,183 @@
+"""
+Timing and peak-memory benchmarks for the extractor and the verification scripts.
+
+A synthetic wave is generated (see generate_corpus.py), then each stage runs in
+its own Python process so its peak memory (max RSS) is measured on its own:
+
+    extraction            MainProgram/main.py
+    content_verification  VerificationProgram/ContentVerification/content_verification.py
+    character_count       VerificationProgram/character_count.py
+    csv_checks            VerificationProgram/run_all_checks.py (duplicates, counts, links)
+
+Results (corpus parameters, every run's wall time, median, peak memory) are
+written to a JSON file. Pass an earlier results file with --baseline to compare:
+any stage whose median time or peak memory grew by more than --tolerance makes
+the script exit with code 1, so regressions show up before a new wave comes in.
+
+Usage:
+    python run_benchmarks.py --universities 300 --repeat 3 --output results.json
+    python run_benchmarks.py --baseline results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import contextlib
+import tempfile
+from datetime import datetime
+
+from generate_corpus import generate_corpus
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+STAGES = ["extraction", "content_verification", "character_count", "csv_checks"]
+
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(REPO_ROOT, "Common"))
+from run_profile import peak_rss_kb
+
+
+def run_stage(stage, corpus, workdir, workers):
+    """Run one stage in this process. Returns wall time in seconds."""
+    for folder in ("MainProgram", "Common", "VerificationProgram",
+                   os.path.join("VerificationProgram", "ContentVerification")):
+        sys.path.insert(0, os.path.join(REPO_ROOT, folder))
+    output_csv = os.path.join(workdir, "output.csv")
+
+    if stage == "extraction":
+        import main
+        main.wave3_path = corpus
+        main.output_csv_path = output_csv
+        main.max_workers = workers
+        start = time.perf_counter()
+        main.main()
+    elif stage == "content_verification":
+        import content_verification
+        os.chdir(workdir)  # The mismatch log is written to the working directory
+        start = time.perf_counter()
+        content_verification.verify_content(corpus, os.path.join(workdir, "university_links.csv"))
+    elif stage == "character_count":
+        import character_count
+        character_count.wave3_path = corpus
+        character_count.check_results_path = os.path.join(workdir, "character_check_results.csv")
+        start = time.perf_counter()
+        character_count.check_character_counts()
+    elif stage == "csv_checks":
+        import run_all_checks
+        start = time.perf_counter()
+        run_all_checks.run_checks(output_csv, corpus, ["msu"])
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    return time.perf_counter() - start
+
+
+def run_child(stage, corpus, workdir, workers):
+    """Run a stage in a fresh interpreter and return {"seconds", "peak_rss_kb"}."""
+    env = dict(os.environ)
+    env.pop("WAVE_SNAPSHOT", None)  # Every stage pays for its own directory scan
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", stage,
+         "--corpus", corpus, "--workdir", workdir, "--workers", str(workers)],
+        capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"Stage {stage} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Print time and memory ratios against a baseline. Returns the stages that regressed."""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        time_ratio = current["median_seconds"] / max(previous["median_seconds"], 1e-9)
+        memory_ratio = current["peak_rss_kb"] / max(previous["peak_rss_kb"], 1)
+        regressed = time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        print(f"{'❌' if regressed else '✅'} {stage}: time x{time_ratio:.2f}, memory x{memory_ratio:.2f}")
+        if regressed:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extractor and verification scripts.")
+    parser.add_argument("--corpus", help="Existing wave folder to use instead of generating one")
+    parser.add_argument("--universities", type=int, default=300)
+    parser.add_argument("--max-files", type=int, default=6)
+    parser.add_argument("--median-chars", type=int, default=6000)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=2021)
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (the median is reported)")
+    parser.add_argument("--workers", type=int, default=8, help="max_workers for the extraction stage")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Inside a stage process: run quietly, then report on the last line of stdout
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            seconds = run_stage(args.child, args.corpus, args.workdir, args.workers)
+        print(json.dumps({"seconds": seconds, "peak_rss_kb": peak_rss_kb()}))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="divhelan_bench_") as tmp:
+        if args.corpus:
+            corpus = os.path.abspath(args.corpus)
+            corpus_info = {"path": corpus}
+        else:
+            corpus = os.path.join(tmp, "wave")
+            corpus_info = generate_corpus(corpus, args.universities, args.max_files, args.median_chars,
+                                          args.outlier_rate, seed=args.seed)
+            print(f"Generated {corpus_info['universities']} universities, "
+                  f"{corpus_info['files']} files, {corpus_info['bytes']} bytes")
+
+        workdir = os.path.join(tmp, "work")
+        os.makedirs(workdir)
+        # The CSV checks need an output CSV to read
+        if "csv_checks" in args.stages and "extraction" not in args.stages:
+            run_child("extraction", corpus, workdir, args.workers)
+
+        results = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": corpus_info,
+            "workers": args.workers,
+            "stages": {},
+        }
+        for stage in [s for s in STAGES if s in args.stages]:
+            runs = [run_child(stage, corpus, workdir, args.workers) for _ in range(args.repeat)]
+            seconds = [run["seconds"] for run in runs]
+            results["stages"][stage] = {
+                "runs_seconds": seconds,
+                "median_seconds": statistics.median(seconds),
+                "peak_rss_kb": max(run["peak_rss_kb"] for run in runs),
+            }
+            print(f"{stage}: median {statistics.median(seconds):.3f}s, "
+                  f"peak memory {results['stages'][stage]['peak_rss_kb'] / 1024:.1f} MiB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Strip the navigation, header and footer text that pages repeat.
+
+The pages saved under one university folder share the same menus, banners and
+footers, and main.py would copy them into every UniversityLink cell. A page is
+cut into blocks, one per line, with every run of whitespace collapsed to one
+space. Blank lines are kept as single paragraph breaks. A block is dropped when it is:
+
+- repeated within the university: it appears in at least university_share of the
+  university's distinct pages (and in at least two of them);
+- repeated across the wave (optional): it appears in at least wave_share of all
+  universities ("Skip to main content", "Copyright 2021 ...").
+
+The wave-wide blocks need a pass over the whole wave before extraction. They are
+counted by their 64-bit hashes with lossy counting (Manku and Motwani): counts
+that cannot reach the threshold are pruned as the pass goes, so memory stays
+bounded however many universities there are. Every block in at least wave_share
+of the universities is found. The hashes are saved next to the output as
+"<output>.boilerplate.json", so incremental runs strip with the same blocks.
+
+A page that is made only of dropped blocks is kept whole (whitespace collapsed),
+so a non-empty file never becomes an empty cell. The bytes removed per university
+are written to "<output>.boilerplate.csv".
+"""
+
+import os
+import csv
+import json
+import math
+import hashlib
+import threading
+from collections import Counter
+
+import wave_manifest
+import wave_source
+
+BLOCKS_SUFFIX = ".boilerplate.json"
+REPORT_SUFFIX = ".boilerplate.csv"
+BLOCKS_VERSION = 1
+REPORT_FIELDNAMES = ["Code", "Pages", "BytesBefore", "BytesAfter", "BytesRemoved", "PercentRemoved"]
+
+
+def blocks_path_for(output_csv_path):
+    """Return the sidecar path of the wave-wide blocks for an output CSV."""
+    return output_csv_path + BLOCKS_SUFFIX
+
+
+def report_path_for(output_csv_path):
+    """Return the per-university report path for an output CSV."""
+    return output_csv_path + REPORT_SUFFIX
+
+
+def normalized_lines(text):
+    """The lines of a page with every run of whitespace collapsed to one space ("" for blank lines)."""
+    return [" ".join(line.split()) for line in text.split("\n")]
+
+
+def block_hash(block):
+    """64-bit hash of a block, the same in every process and run."""
+    return int.from_bytes(hashlib.blake2b(block.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _join(lines, dropped, wave_blocks):
+    """Join the kept lines of a page, with at most one blank line between paragraphs."""
+    kept = []
+    for line in lines:
+        if not line:
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+        if line in dropped or (wave_blocks and block_hash(line) in wave_blocks):
+            continue
+        kept.append(line)
+    if kept and not kept[-1]:
+        kept.pop()
+    return "\n".join(kept)
+
+
+class Stripper:
+    """
+    Removes boilerplate blocks from the pages of one university at a time. strip() is safe
+    to call from several threads; the bytes before and after are kept per university code.
+    """
+
+    def __init__(self, university_share=0.5, wave_blocks=frozenset()):
+        self.university_share = university_share
+        self.wave_blocks = wave_blocks
+        self.lock = threading.Lock()
+        self.codes = {}  # Code -> (pages, UTF-8 bytes before, UTF-8 bytes after)
+
+    def strip(self, code, pages):
+        """Return the pages of one university with the boilerplate removed. None and "" are kept as they are."""
+        page_lines = {}
+        distinct = set()
+        block_pages = Counter()  # Block -> number of distinct pages it appears in
+        for i, page in enumerate(pages):
+            if not page:
+                continue
+            page_lines[i] = lines = normalized_lines(page)
+            if page not in distinct:  # A page saved twice must not make all of its lines "repeated"
+                distinct.add(page)
+                block_pages.update(set(lines))
+        needed = max(2, math.ceil(self.university_share * len(distinct)))
+        repeated = {block for block, count in block_pages.items() if count >= needed and block}
+
+        stripped = list(pages)
+        before = after = 0
+        for i, lines in page_lines.items():
+            text = _join(lines, repeated, self.wave_blocks) or _join(lines, (), None)
+            stripped[i] = text
+            before += len(pages[i].encode('utf-8'))
+            after += len(text.encode('utf-8'))
+        with self.lock:
+            self.codes[code] = (len(page_lines), before, after)
+        return stripped
+
+    def summary(self):
+        """One-line statistics for the run summary."""
+        before = sum(b for _, b, _ in self.codes.values())
+        after = sum(a for _, _, a in self.codes.values())
+        share = 100 * (before - after) / before if before else 0.0
+        return (f"Boilerplate: {before - after} of {before} text bytes removed ({share:.1f}%) "
+                f"from {len(self.codes)} universities")
+
+
+class BlockCounter:
+    """
+    Lossy counting of the number of universities each block hash appears in. Counts are
+    under by at most error * universities, and entries that cannot reach that are pruned
+    after every 1 / error universities.
+    """
+
+    def __init__(self, error):
+        self.width = math.ceil(1 / error)
+        self.error = error
+        self.universities = 0
+        self.counts = {}  # Block hash -> [count, largest possible undercount]
+
+    def add(self, hashes):
+        """Count the distinct block hashes of one university."""
+        self.universities += 1
+        bucket = math.ceil(self.universities / self.width)
+        for h in hashes:
+            entry = self.counts.get(h)
+            if entry is None:
+                self.counts[h] = [1, bucket - 1]
+            else:
+                entry[0] += 1
+        if self.universities % self.width == 0:
+            self.counts = {h: entry for h, entry in self.counts.items() if entry[0] + entry[1] > bucket}
+
+    def frequent(self, share):
+        """Every block hash in at least share of the universities (and in at least two)."""
+        needed = max(2, (share - self.error) * self.universities)
+        return frozenset(h for h, (count, _) in self.counts.items() if count >= needed)
+
+
+def count_wave_blocks(wave_path, snapshot, share):
+    """Read every page of the wave once and return the hashes of the blocks in at least share of the universities."""
+    counter = BlockCounter(share / 10)
+    for code in snapshot.folder_names():
+        hashes = set()
+        for txt_file in snapshot.txt_files(code):
+            try:
+                raw, _, _ = wave_source.read_source(wave_path, code, txt_file)
+                text = wave_manifest.decode_text(raw)
+            except Exception:
+                continue  # main.py reports unreadable files
+            hashes.update(block_hash(line) for line in normalized_lines(text) if line)
+        counter.add(hashes)
+    return counter.frequent(share)
+
+
+def save_blocks(path, share, blocks):
+    """Write the wave-wide block hashes atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": BLOCKS_VERSION, "wave_share": share,
+                   "blocks": sorted(f"{h:016x}" for h in blocks)}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_blocks(path, share):
+    """The saved wave-wide block hashes, or None if they are missing or were counted with another share."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("version") != BLOCKS_VERSION or saved.get("wave_share") != share:
+        return None
+    return frozenset(int(h, 16) for h in saved["blocks"])
+
+
+def saved_stripper(output_csv_path, university_share, wave_share=None):
+    """
+    The Stripper an existing output was written with: the wave-wide blocks are the ones saved by
+    its last full run. None if wave_share is set but those blocks were not saved (or another share was).
+    """
+    wave_blocks = frozenset()
+    if wave_share:
+        wave_blocks = load_blocks(blocks_path_for(output_csv_path), wave_share)
+        if wave_blocks is None:
+            return None
+    return Stripper(university_share, wave_blocks)
+
+
+def _report_row(code, pages, before, after):
+    percent = round(100 * (before - after) / before, 1) if before else 0.0
+    return {"Code": code, "Pages": pages, "BytesBefore": before, "BytesAfter": after,
+            "BytesRemoved": before - after, "PercentRemoved": percent}
+
+
+def write_report(path, codes, removed_codes=(), update=False):
+    """
+    Write the per-university report atomically, in Code order. With update=True the rows of an
+    existing report are kept unless their code is in codes (replaced) or removed_codes (dropped).
+    """
+    rows = {}
+    if update and os.path.exists(path):
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows[row["Code"]] = row
+    for code in removed_codes:
+        rows.pop(code, None)
+    for code, (pages, before, after) in codes.items():
+        rows[code] = _report_row(code, pages, before, after)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDNAMES)
+        writer.writeheader()
+        for code in sorted(rows):
+            writer.writerow(rows[code])
+    os.replace(tmp_path, path)
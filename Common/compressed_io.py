@@ -0,0 +1,78 @@
+"""
+Transparent compression for the output CSV.
+
+Writing: the codec is picked from the file name, ".gz" (gzip), ".bz2" (bzip2) or
+".xz" (LZMA); any other name is written uncompressed. Rows are compressed as
+they are streamed out, so nothing extra is held in memory.
+
+Reading: the codec is detected from the first bytes of the file, so a compressed
+CSV is read correctly whatever its name. Every script that reads the output
+goes through open_csv, so "output_wave3_content_ordered.csv.gz" can be passed
+wherever the plain CSV was.
+
+Gzip output is written with a fixed header timestamp, so the same rows always
+give the same bytes.
+"""
+
+import io
+import bz2
+import gzip
+import lzma
+
+GZIP_LEVEL = 6  # Same trade-off as the gzip command line tool
+
+_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+_MAGIC = [(b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz")]
+
+
+def compression_for(path):
+    """Codec implied by a file name ("gzip", "bz2", "xz"), or None for a plain file."""
+    for suffix, codec in _SUFFIXES.items():
+        if path.lower().endswith(suffix):
+            return codec
+    return None
+
+
+def detect_compression(path):
+    """Codec of an existing file, from its first bytes, or None if it is not compressed."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, codec in _MAGIC:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def is_compressed(path):
+    """True if an existing file is compressed."""
+    return detect_compression(path) is not None
+
+
+def open_binary(path, mode, compression="auto"):
+    """
+    Open a file in binary mode ('rb' or 'wb'). compression works as in open_csv.
+    Compressed files opened for reading can still seek() forward (by decompressing
+    up to the new position), which is what the byte-offset index of csv_index needs.
+    """
+    if compression == "auto":
+        compression = detect_compression(path) if mode == 'rb' else compression_for(path)
+    if compression == "gzip":
+        return gzip.GzipFile(path, mode, compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == "bz2":
+        return bz2.BZ2File(path, mode)
+    if compression == "xz":
+        return lzma.LZMAFile(path, mode)
+    return open(path, mode)
+
+
+def open_csv(path, mode='r', compression="auto"):
+    """
+    Open a CSV as text (newline='', UTF-8) for csv.reader/csv.writer.
+    compression="auto" detects the codec when reading and uses the file name when
+    writing; pass a codec name (or None) to choose it, e.g. for a temporary file.
+    """
+    if compression == "auto":
+        compression = detect_compression(path) if mode == 'r' else compression_for(path)
+    if compression is None:
+        return open(path, mode, newline='', encoding='utf-8')
+    return io.TextIOWrapper(open_binary(path, mode + 'b', compression), encoding='utf-8', newline='')
@@ -0,0 +1,235 @@
+"""
+Content-addressed store for page texts.
+
+Many pages are identical across links and across universities (shared
+boilerplate pages, the same policy page linked twice, ...). With a store, each
+distinct text is saved once under its SHA-256, and the output CSV cells hold a
+short reference instead of the full text:
+
+    sha256:3f9a...c1            (the SHA-256 of the cell text, UTF-8 encoded)
+
+Store layout (one file per distinct text, split into 256 subfolders):
+
+    content_store/
+        3f/3f9a...c1.txt
+        ...
+
+Cells that are empty or hold the "ERROR_READING_FILE" placeholder are kept as
+they are.
+
+With a spill threshold, only texts longer than the threshold (in characters) go
+to the store; shorter texts stay in the CSV. A spilled cell also records the
+length of the text, so checks can tell how long a page is without reading it:
+
+    sha256:3f9a...c1:184233      (digest, then the length in characters)
+
+The default threshold, CELL_CHARACTER_LIMIT, is the Google Sheets cell limit, so
+a spilled CSV can be imported into Sheets without losing the long pages. Readers
+resolve references only when they need a text (see LazyStore).
+
+expand_csv turns a CSV with references back into a normal CSV:
+
+    python Common/content_store.py expand refs.csv full.csv --store content_store
+
+Texts that are no longer referenced are never deleted; remove the store folder
+and rebuild to clean it up.
+"""
+
+import os
+import re
+import csv
+import sys
+import hashlib
+import argparse
+import threading
+
+import compressed_io
+
+REF_PREFIX = "sha256:"
+CELL_CHARACTER_LIMIT = 50000  # Google Sheets cell character limit
+_REF_PATTERN = re.compile(r"sha256:[0-9a-f]{64}(?::[0-9]{1,18})?")
+_DIGEST_END = len(REF_PREFIX) + 64
+
+
+def is_ref(value):
+    """True if a cell value is a store reference (with or without a length) rather than page text."""
+    return (isinstance(value, str) and _DIGEST_END <= len(value) <= _DIGEST_END + 19
+            and _REF_PATTERN.fullmatch(value) is not None)
+
+
+def ref_digest(ref):
+    """The SHA-256 (hex) of the text behind a reference."""
+    return ref[len(REF_PREFIX):_DIGEST_END]
+
+
+def ref_length(ref):
+    """The length in characters recorded in a spilled cell's reference, or None."""
+    return int(ref[_DIGEST_END + 1:]) if len(ref) > _DIGEST_END else None
+
+
+class ContentStore:
+    """
+    A folder of texts keyed by SHA-256. put() is safe to call from several threads;
+    each distinct text is written to disk at most once, and its reference is only
+    returned once the file exists. With spill_threshold, cell() only stores texts
+    longer than the threshold.
+    """
+
+    def __init__(self, store_dir, spill_threshold=None):
+        self.store_dir = store_dir
+        self.spill_threshold = spill_threshold
+        os.makedirs(store_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.seen = set()        # Digests put during this run
+        self.writing = {}        # Digest -> Event set once its file is on disk
+        self.pages = 0           # Texts put during this run
+        self.bytes_total = 0     # UTF-8 bytes of every text put
+        self.bytes_unique = 0    # UTF-8 bytes of the distinct texts
+        self.written = 0         # Texts that were new to the store and written to disk
+
+    def path_for(self, digest):
+        return os.path.join(self.store_dir, digest[:2], digest + ".txt")
+
+    def put(self, text):
+        """Store a text (if it is not stored yet) and return its reference."""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            self.pages += 1
+            self.bytes_total += len(data)
+            first = digest not in self.seen
+            if first:
+                self.seen.add(digest)
+                self.bytes_unique += len(data)
+                done = self.writing[digest] = threading.Event()
+            else:
+                done = self.writing.get(digest)
+        if not first:
+            # Another thread may still be writing this text: only hand out the reference once the
+            # file exists, so the caller can read it back right away
+            if done is not None:
+                done.wait()
+            return REF_PREFIX + digest
+
+        try:
+            path = self.path_for(digest)
+            if not os.path.exists(path):  # Stored by an earlier run otherwise
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                with self.lock:
+                    self.written += 1
+        finally:
+            with self.lock:
+                del self.writing[digest]
+            done.set()
+        return REF_PREFIX + digest
+
+    def cell(self, text):
+        """
+        The value to write into a CSV cell for a page text: a reference, or the text itself
+        when it is empty or (with a spill threshold) not longer than the threshold.
+        """
+        if not text:
+            return text
+        if self.spill_threshold is None:
+            return self.put(text)
+        if len(text) <= self.spill_threshold:
+            return text
+        return f"{self.put(text)}:{len(text)}"
+
+    def get(self, ref):
+        """Return the text behind a reference."""
+        with open(self.path_for(ref_digest(ref)), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def check(self, ref):
+        """True if the stored text still hashes to its reference."""
+        digest = ref_digest(ref)
+        try:
+            with open(self.path_for(digest), 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest() == digest
+        except OSError:
+            return False
+
+    def summary(self):
+        """One-line dedup statistics for the run summary."""
+        duplicates = self.pages - len(self.seen)
+        saved = self.bytes_total - self.bytes_unique
+        return (f"Dedup: {self.pages} pages, {len(self.seen)} distinct texts ({duplicates} duplicates), "
+                f"{self.bytes_unique} of {self.bytes_total} text bytes kept ({saved} saved), "
+                f"{self.written} new texts written to {self.store_dir}")
+
+
+def expand_row(row, store):
+    """Return a copy of a row with every store reference replaced by its text."""
+    return {key: store.get(value) if is_ref(value) else value for key, value in row.items()}
+
+
+def expand_csv(ref_csv_path, store_dir, output_csv_path):
+    """Write a normal CSV with full texts from a CSV that holds store references. Returns the row count."""
+    csv.field_size_limit(sys.maxsize)  # Handle large text fields
+    store = ContentStore(store_dir)
+    rows = 0
+    tmp_path = output_csv_path + ".tmp"
+    with compressed_io.open_csv(ref_csv_path) as ref_file, \
+            compressed_io.open_csv(tmp_path, 'w', compressed_io.compression_for(output_csv_path)) as out_file:
+        reader = csv.DictReader(ref_file)
+        writer = csv.DictWriter(out_file, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        for row in reader:
+            writer.writerow(expand_row(row, store))
+            rows += 1
+    os.replace(tmp_path, output_csv_path)
+    return rows
+
+
+def default_store_dir(csv_path):
+    """Store folder used when none is given: "content_store" next to the CSV."""
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), "content_store")
+
+
+class LazyStore:
+    """
+    Resolves the references of an output for a reader. Nothing is opened until the first
+    reference is looked up; without store_dir the default folder next to the CSV is used.
+    """
+
+    def __init__(self, csv_path, store_dir=None):
+        self.csv_path = csv_path
+        self.store_dir = store_dir
+        self.store = None
+
+    def _open(self):
+        if self.store is None:
+            store_dir = self.store_dir or default_store_dir(self.csv_path)
+            if not os.path.isdir(store_dir):
+                raise ValueError(f"{self.csv_path} holds content store references but {store_dir} "
+                                 f"does not exist; set content_store_path")
+            self.store = ContentStore(store_dir)
+        return self.store
+
+    def get(self, ref):
+        return self._open().get(ref)
+
+    def check(self, ref):
+        return self._open().check(ref)
+
+    def resolve(self, value):
+        """The page text of a cell: the text behind a reference, or the cell itself."""
+        return self.get(value) if is_ref(value) else value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expand a CSV of content store references into full texts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    expand = subparsers.add_parser("expand", help="Write a normal CSV with the full texts")
+    expand.add_argument("ref_csv")
+    expand.add_argument("output_csv")
+    expand.add_argument("--store", help="Store folder (default: content_store next to ref_csv)")
+    args = parser.parse_args()
+
+    count = expand_csv(args.ref_csv, args.store or default_store_dir(args.ref_csv), args.output_csv)
+    print(f"Expanded {count} rows into: {args.output_csv}")
@@ -0,0 +1,118 @@
+"""
+Byte-offset index for the output CSV, so one university's row can be read without
+parsing every row before it.
+
+The index records the byte offset where each Code's row starts and is saved next
+to the CSV as "<csv>.index.json". It is stamped with the CSV's size and mtime and
+rebuilt automatically as soon as the CSV changes.
+
+Index layout:
+{
+    "version": 1,
+    "csv": {"size": 123, "mtime_ns": 456},
+    "fieldnames": ["W4.Num", "Code", "UniversityLink1", ...],
+    "offsets": {"adelphi": 98, "albany": 21011, ...}
+}
+"""
+
+import os
+import csv
+import sys
+import json
+
+import compressed_io
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json"
+
+
+def index_path_for(csv_path):
+    """Return the sidecar index path for a CSV."""
+    return csv_path + INDEX_SUFFIX
+
+
+def _csv_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _records_with_offsets(file):
+    """
+    Yield (offset, record) for every CSV record of a file opened in binary mode.
+    csv.reader pulls exactly the physical lines one record needs (quoted cells can
+    span lines), so the byte count consumed before each record is its offset.
+    """
+    consumed = [file.tell()]
+
+    def lines():
+        for line in file:
+            consumed[0] += len(line)
+            yield line.decode('utf-8')
+
+    reader = csv.reader(lines())
+    while True:
+        offset = consumed[0]
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        yield offset, record
+
+
+def build_index(csv_path):
+    """Scan the CSV once, save the index beside it and return it."""
+    csv.field_size_limit(sys.maxsize)  # Handle large text fields
+
+    offsets = {}
+    with compressed_io.open_binary(csv_path, 'rb') as file:
+        records = _records_with_offsets(file)
+        _, fieldnames = next(records, (0, []))
+        code_column = fieldnames.index("Code")
+        for offset, record in records:
+            if len(record) > code_column:
+                offsets.setdefault(record[code_column], offset)  # Keep the first row of a duplicated code
+
+    index = {"version": INDEX_VERSION, "csv": _csv_stamp(csv_path), "fieldnames": fieldnames, "offsets": offsets}
+    tmp_path = index_path_for(csv_path) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path_for(csv_path))
+    return index
+
+
+def load_index(csv_path):
+    """Return the CSV's index, rebuilding it if it is missing or out of date."""
+    try:
+        with open(index_path_for(csv_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION and index.get("csv") == _csv_stamp(csv_path):
+            return index
+    except (OSError, ValueError):
+        pass
+    return build_index(csv_path)
+
+
+def read_rows(csv_path, codes, index=None):
+    """
+    Read the rows of several codes by seeking straight to them.
+    Returns {code: row dict}; codes that are not in the CSV are left out.
+    Rows are read in file order so the seeks only move forward.
+    """
+    csv.field_size_limit(sys.maxsize)  # Handle large text fields
+    if index is None:
+        index = load_index(csv_path)
+
+    fieldnames = index["fieldnames"]
+    wanted = sorted((index["offsets"][code], code) for code in set(codes) if code in index["offsets"])
+    rows = {}
+    with compressed_io.open_binary(csv_path, 'rb') as file:
+        for offset, code in wanted:
+            file.seek(offset)
+            _, record = next(_records_with_offsets(file))
+            rows[code] = dict(zip(fieldnames, record))
+    return rows
+
+
+def read_row(csv_path, code, index=None):
+    """Read one code's row as a dict, or None if the code is not in the CSV."""
+    return read_rows(csv_path, [code], index).get(code)
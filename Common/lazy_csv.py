@@ -0,0 +1,196 @@
+"""
+Column-projecting CSV reader that works on the raw bytes.
+
+Checks that only need the Code column, or only the number of rows, should not
+turn every multi-hundred-kilobyte UniversityLink cell into a Python string (and
+should not need csv.field_size_limit for it). The file is read in large binary
+chunks:
+
+- iter_columns(path, ["Code"]) decodes only the requested cells. Every other cell
+  is skipped with bytes.find / a compiled regex, so large cells are never copied
+  into Python objects, and a cell that runs past the end of a chunk is dropped
+  instead of being kept. Memory stays at about one chunk.
+- count_records(path) counts the line breaks outside quoted cells. A quote toggles
+  "inside a cell" and a doubled quote ("") toggles it twice, so it is enough to
+  split each chunk on quotes and count newlines in every other piece.
+
+The reader understands what csv.writer writes: "," delimiters, '"' quoting with
+doubled quotes inside quoted cells, and "\\r\\n" or "\\n" line ends. Compressed
+CSVs are read through compressed_io.
+"""
+
+import re
+
+import compressed_io
+
+CHUNK_SIZE = 1 << 20  # Bytes read at a time
+
+_UNQUOTED_END = re.compile(rb"[,\n]")
+_QUOTE = 0x22
+_COMMA = 0x2C
+_CR = 0x0D
+
+
+class _ByteScanner:
+    """Reads CSV fields from a binary file, a chunk at a time."""
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+
+    def _fill(self):
+        """Drop the bytes before pos and append the next chunk. Returns False at the end of the file."""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _byte(self):
+        """The byte at pos, or None at the end of the file."""
+        if self.pos >= len(self.buf) and not self._fill():
+            return None
+        return self.buf[self.pos]
+
+    def at_end(self):
+        return self._byte() is None
+
+    def field(self, keep):
+        """
+        Read the field at pos. Returns (bytes if keep else None, terminator), where the
+        terminator is "," (more fields follow), "\\n" (end of record) or "" (end of file).
+        """
+        if self._byte() == _QUOTE:
+            value = self._quoted(keep)
+            # A quoted cell is followed by a delimiter, a line end or the end of the file
+            byte = self._byte()
+            if byte == _CR:
+                self.pos += 1
+                byte = self._byte()
+            if byte is None:
+                return value, ""
+            self.pos += 1
+            return value, "," if byte == _COMMA else "\n"
+        return self._unquoted(keep)
+
+    def _quoted(self, keep):
+        parts = [] if keep else None
+        self.pos += 1  # Opening quote
+        while True:
+            i = self.buf.find(b'"', self.pos)
+            if i < 0:
+                # The cell goes on in the next chunk; skipped cells are not kept
+                if keep:
+                    parts.append(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("CSV ends inside a quoted cell")
+                continue
+            if keep:
+                parts.append(self.buf[self.pos:i])
+            self.pos = i
+            # Look at the byte after the quote: a second quote is an escaped '"'
+            if i + 1 >= len(self.buf) and not self._fill():
+                self.pos += 1
+                break
+            if self.buf[self.pos + 1] == _QUOTE:
+                if keep:
+                    parts.append(b'"')
+                self.pos += 2
+                continue
+            self.pos += 1  # Closing quote
+            break
+        return b"".join(parts) if keep else None
+
+    def _unquoted(self, keep):
+        parts = [] if keep else None
+        while True:
+            match = _UNQUOTED_END.search(self.buf, self.pos)
+            if match is None:
+                if keep:
+                    parts.append(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    terminator = ""
+                    break
+                continue
+            end = match.start()
+            if keep:
+                parts.append(self.buf[self.pos:end])
+            self.pos = end + 1
+            terminator = "," if self.buf[end] == _COMMA else "\n"
+            break
+        if not keep:
+            return None, terminator
+        value = b"".join(parts)
+        if terminator != "," and value.endswith(b"\r"):
+            value = value[:-1]
+        return value, terminator
+
+    def record(self):
+        """Every field of the next record, decoded (used for the header)."""
+        fields = []
+        while True:
+            value, terminator = self.field(keep=True)
+            fields.append(value.decode("utf-8"))
+            if terminator != ",":
+                return fields
+
+
+def iter_columns(path, columns, chunk_size=CHUNK_SIZE):
+    """
+    Yield a tuple with the values of the given columns for every record after the header.
+    Cells of other columns are skipped without being decoded; a column that a short record
+    does not reach gives None (like csv.DictReader). Blank lines are skipped.
+    """
+    with compressed_io.open_binary(path, "rb") as file:
+        scanner = _ByteScanner(file, chunk_size)
+        if scanner.at_end():
+            return
+        header = scanner.record()
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"{path} has no column {', '.join(missing)}")
+        positions = [header.index(column) for column in columns]
+        wanted = set(positions)
+        last = max(positions, default=-1)
+
+        while not scanner.at_end():
+            values = {}
+            index = 0
+            while True:
+                # The first cell (W4.Num) is always kept: it is small and tells a blank line apart
+                value, terminator = scanner.field(keep=index in wanted or index == 0)
+                if value is not None:
+                    values[index] = value
+                if terminator != ",":
+                    break
+                index += 1
+                if index > last:
+                    # Everything that was asked for is read: skip the rest of the record
+                    while terminator == ",":
+                        _, terminator = scanner.field(keep=False)
+                    break
+            if index == 0 and not values[0]:
+                continue  # A blank line
+            yield tuple(values[p].decode("utf-8") if p in values else None for p in positions)
+
+
+def count_records(path, chunk_size=CHUNK_SIZE):
+    """Number of records in a CSV, header included, counting only line breaks outside quoted cells."""
+    records = 0
+    in_quotes = False
+    last = b"\n"
+    with compressed_io.open_binary(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            pieces = chunk.split(b'"')
+            records += sum(piece.count(b"\n") for piece in pieces[1 if in_quotes else 0::2])
+            if len(pieces) % 2 == 0:
+                in_quotes = not in_quotes
+            last = chunk[-1:]
+    if last != b"\n":
+        records += 1  # The last record has no line break
+    return records
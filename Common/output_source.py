@@ -0,0 +1,102 @@
+"""
+Read the extracted wave from whichever output it was written to.
+
+The verification scripts accept the output CSV, the SQLite database written by
+main.py (".db", ".sqlite", ".sqlite3") or a shard manifest (".shards.json"); CSVs
+may be gzip/bzip2/xz compressed (see compressed_io.py). All of them give rows
+shaped like csv.DictReader rows: {"W4.Num": ..., "Code": ..., "UniversityLink1": ..., ...}.
+
+A sharded output is made of several independent parts; map_output_parts runs a
+function over the parts in parallel worker processes.
+
+Checks that only need a few columns (the Code column) or the number of rows use
+iter_output_columns / count_output_rows, which read CSVs with lazy_csv: the other
+cells, including the large UniversityLink texts, are skipped as raw bytes.
+"""
+
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import csv_index
+import compressed_io
+import lazy_csv
+import sqlite_output
+import sharded_output
+
+
+def output_parts(path):
+    """The files that make up an output: the shard CSVs of a manifest, or the path itself."""
+    if sharded_output.is_shard_manifest(path):
+        return [shard["path"] for shard in sharded_output.load_shard_manifest(path)["shards"]]
+    return [path]
+
+
+def map_output_parts(path, func, *args, workers=None):
+    """
+    Call func(part, *args) for every part of an output and return the results in part order.
+    Shards are processed in parallel by a process pool; func must be a module-level function.
+    """
+    parts = output_parts(path)
+    if len(parts) <= 1:
+        return [func(part, *args) for part in parts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, parts, *[[arg] * len(parts) for arg in args]))
+
+
+def output_codes(path):
+    """Every Code of an output, in order."""
+    return [code for code, in iter_output_columns(path, ["Code"])]
+
+
+def iter_output_columns(path, columns):
+    """Yield a tuple with the values of the given columns for every university row, in order."""
+    if sharded_output.is_shard_manifest(path):
+        for part in output_parts(path):
+            yield from iter_output_columns(part, columns)
+        return
+    if sqlite_output.is_sqlite_path(path):
+        for row in sqlite_output.iter_rows(path):
+            yield tuple(row.get(column) for column in columns)
+        return
+    yield from lazy_csv.iter_columns(path, columns)
+
+
+def iter_output_rows(path):
+    """Yield every university row, in file (W4.Num) order."""
+    if sharded_output.is_shard_manifest(path):
+        for part in output_parts(path):
+            yield from iter_output_rows(part)
+        return
+    if sqlite_output.is_sqlite_path(path):
+        yield from sqlite_output.iter_rows(path)
+        return
+
+    csv.field_size_limit(sys.maxsize)  # Handle large text fields
+    with compressed_io.open_csv(path) as file:
+        yield from csv.DictReader(file)
+
+
+def read_output_rows(path, codes):
+    """Return {code: row dict} for a few codes without scanning the whole output."""
+    if sharded_output.is_shard_manifest(path):
+        # Only open the shards whose code range can contain the wanted codes
+        rows = {}
+        for shard in sharded_output.load_shard_manifest(path)["shards"]:
+            wanted = [code for code in codes if shard["first_code"] <= code <= shard["last_code"]]
+            if wanted:
+                rows.update(csv_index.read_rows(shard["path"], wanted))
+        return rows
+    if sqlite_output.is_sqlite_path(path):
+        return sqlite_output.read_rows(path, codes)
+    return csv_index.read_rows(path, codes)
+
+
+def count_output_rows(path):
+    """Number of university rows (the CSV header is not counted)."""
+    if sharded_output.is_shard_manifest(path):
+        return sum(map_output_parts(path, count_output_rows))
+    if sqlite_output.is_sqlite_path(path):
+        return sqlite_output.count_rows(path)
+    # Count the line breaks outside quoted cells instead of parsing every cell
+    return lazy_csv.count_records(path) - 1
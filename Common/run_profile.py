@@ -0,0 +1,181 @@
+"""
+Opt-in instrumentation for extraction runs.
+
+A RunProfile collects, while a run is going:
+- wall time per stage (listing, reading, hashing, decoding, stripping, CSV writing, ...)
+- bytes read and time taken per university
+- the slowest files
+- the peak memory of the process
+and writes them as a JSON report next to the output CSV ("<csv>.profile.json").
+With cprofile=True the run is also recorded by cProfile: the raw stats are saved
+as "<csv>.profile.pstats" (open them with "python -m pstats") and the top
+functions by cumulative time are added to the report. cProfile only sees the
+main thread, so use max_workers = 1 to see the file reading in it too.
+
+When profiling is off, scripts use NULL_PROFILE, whose methods do nothing, so the
+instrumented code paths cost a few no-op calls per file.
+
+Report layout:
+{
+    "version": 1,
+    "wall_seconds": 12.3,
+    "peak_rss_kb": 45678,
+    "stages": {"listing": {"seconds": 0.2, "calls": 1}, "reading": {...}, ...},
+    "universities": {"adelphi": {"files": 3, "bytes": 1234, "seconds": 0.01}, ...},
+    "slowest_files": [{"file": "msu/2.txt", "bytes": 153522, "seconds": 0.05}, ...],
+    "cprofile": {"stats_file": "...", "top_functions": [...]}      # only with cprofile=True
+}
+Stage times measured inside worker threads are summed over all threads, so they
+can add up to more than wall_seconds.
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import threading
+import contextlib
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+PROFILE_VERSION = 1
+PROFILE_SUFFIX = ".profile.json"
+
+
+def profile_path_for(output_csv_path):
+    """Return the profile report path for an output CSV."""
+    return output_csv_path + PROFILE_SUFFIX
+
+
+def peak_rss_kb():
+    """Peak resident memory of this process in KiB, or None where it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # Bytes on macOS, KiB on Linux
+
+
+class RunProfile:
+    """Collects stage timings and per-file measurements; safe to feed from worker threads."""
+
+    enabled = True
+
+    def __init__(self, top_files=20, cprofile=False):
+        self.top_files = top_files
+        self.stages = {}          # Stage name -> {"seconds", "calls"}
+        self.universities = {}    # Code -> {"files", "bytes", "seconds"}
+        self.slowest = []         # Min-heap of (seconds, file, bytes), at most top_files long
+        self.lock = threading.Lock()
+        self.profiler = None
+        if cprofile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        self.start_time = None
+
+    def start(self):
+        """Start the wall clock (and cProfile, if requested)."""
+        self.start_time = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def add_time(self, stage, seconds, calls=1):
+        """Add time spent in a stage."""
+        with self.lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += calls
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one call of the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def record_file(self, code, file_name, nbytes, stage_seconds):
+        """
+        Record one source file: nbytes read and {stage: seconds} spent on it
+        (e.g. reading, hashing, decoding, stripping).
+        """
+        seconds = sum(stage_seconds.values())
+        with self.lock:
+            for stage, spent in stage_seconds.items():
+                entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+                entry["seconds"] += spent
+                entry["calls"] += 1
+            university = self.universities.setdefault(code, {"files": 0, "bytes": 0, "seconds": 0.0})
+            university["files"] += 1
+            university["bytes"] += nbytes
+            university["seconds"] += seconds
+            item = (seconds, f"{code}/{file_name}", nbytes)
+            if len(self.slowest) < self.top_files:
+                heapq.heappush(self.slowest, item)
+            elif item > self.slowest[0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def report(self):
+        """Return the report as a dict."""
+        wall = time.perf_counter() - self.start_time if self.start_time is not None else None
+        return {
+            "version": PROFILE_VERSION,
+            "wall_seconds": wall,
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": self.stages,
+            "universities": self.universities,
+            "slowest_files": [{"file": name, "bytes": nbytes, "seconds": seconds}
+                              for seconds, name, nbytes in sorted(self.slowest, reverse=True)],
+        }
+
+    def write_report(self, report_path, top_functions=30):
+        """Stop cProfile (if running) and write the JSON report atomically. Returns the report path."""
+        if self.profiler is not None:
+            self.profiler.disable()
+        report = self.report()
+        if self.profiler is not None:
+            import pstats
+            stats_path = os.path.splitext(report_path)[0] + ".pstats"
+            self.profiler.dump_stats(stats_path)
+            stats = pstats.Stats(stats_path)
+            ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            report["cprofile"] = {
+                "stats_file": stats_path,
+                "top_functions": [
+                    {"function": f"{filename}:{line}({func})", "calls": calls,
+                     "total_seconds": total, "cumulative_seconds": cumulative}
+                    for (filename, line, func), (_, calls, total, cumulative, _) in ranked[:top_functions]
+                ],
+            }
+
+        tmp_path = report_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        os.replace(tmp_path, report_path)
+        return report_path
+
+
+class _NullProfile:
+    """Stand-in used when profiling is off: every call is a no-op."""
+
+    enabled = False
+    _no_stage = contextlib.nullcontext()
+
+    def start(self):
+        pass
+
+    def add_time(self, stage, seconds, calls=1):
+        pass
+
+    def stage(self, name):
+        return self._no_stage
+
+    def record_file(self, code, file_name, nbytes, stage_seconds):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
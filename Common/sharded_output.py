@@ -0,0 +1,165 @@
+"""
+Sharded CSV output for huge waves.
+
+Instead of one monolithic CSV, main.py can split the rows into several shard CSVs,
+each holding an alphabetically contiguous range of codes and staying under a byte
+and/or row budget. Every shard is a normal CSV with its own header, so it can be
+uploaded, imported or verified on its own. A small manifest describes the shards:
+
+    output_wave3_content_ordered.csv.shards.json
+    {
+        "version": 1,
+        "fieldnames": ["W4.Num", "Code", ...],
+        "shards": [
+            {"file": "output_wave3_content_ordered.part001.csv",
+             "first_code": "adelphi", "last_code": "byu", "rows": 120, "bytes": 9876543},
+            ...
+        ]
+    }
+
+Shard files are written by background threads: while one shard is still being
+flushed to disk, the next one is already being filled.
+
+If the output name ends in .gz, .bz2 or .xz, every shard is compressed the same
+way ("output_wave3_content_ordered.part001.csv.gz"); the byte budget still counts
+the uncompressed CSV bytes.
+"""
+
+import io
+import os
+import csv
+import json
+import queue
+import threading
+
+import compressed_io
+
+SHARD_MANIFEST_VERSION = 1
+SHARD_MANIFEST_SUFFIX = ".shards.json"
+
+
+def shard_manifest_path_for(output_csv_path):
+    """Return the shard manifest path for an output CSV."""
+    return output_csv_path + SHARD_MANIFEST_SUFFIX
+
+
+def is_shard_manifest(path):
+    """True if the path names a shard manifest instead of a single output file."""
+    return path.endswith(SHARD_MANIFEST_SUFFIX)
+
+
+def load_shard_manifest(manifest_path):
+    """Load a shard manifest and resolve shard file names to full paths."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    folder = os.path.dirname(os.path.abspath(manifest_path))
+    for shard in manifest["shards"]:
+        shard["path"] = os.path.join(folder, shard["file"])
+    return manifest
+
+
+class _ShardFile(threading.Thread):
+    """Background thread that writes pre-encoded rows of one shard to disk."""
+
+    def __init__(self, path, header):
+        super().__init__(daemon=True)
+        self.path = path
+        self.lines = queue.Queue(maxsize=64)  # Bounded, so a slow disk slows the producer down
+        self.lines.put(header)
+        self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            with compressed_io.open_binary(self.path, 'wb') as f:
+                while True:
+                    data = self.lines.get()
+                    if data is None:
+                        break
+                    f.write(data)
+        except Exception as e:  # Reported by ShardedCsvWriter.close()
+            self.error = e
+            # Keep draining so the producer never blocks on a dead writer
+            while self.lines.get() is not None:
+                pass
+
+
+class ShardedCsvWriter:
+    """
+    Writes university rows into budgeted shard CSVs plus a shard manifest.
+    A new shard starts when the next row would push the current one over
+    max_bytes, or when it already holds max_rows rows. A row larger than the
+    byte budget gets a shard of its own.
+    """
+
+    def __init__(self, output_csv_path, fieldnames, max_bytes=None, max_rows=None):
+        self.output_csv_path = output_csv_path
+        self.fieldnames = fieldnames
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+
+        root, suffix = os.path.splitext(output_csv_path)
+        if compressed_io.compression_for(output_csv_path):
+            root, _ = os.path.splitext(root)  # "x.csv.gz" -> "x.partNNN.csv.gz"
+        else:
+            suffix = ""
+        self.name_pattern = root + ".part{:03d}.csv" + suffix
+
+        # Rows are serialized here, in the caller's thread, so shard sizes are exact
+        self.buffer = io.StringIO()
+        self.row_writer = csv.DictWriter(self.buffer, fieldnames=fieldnames)
+        self.row_writer.writeheader()
+        self.header = self._take_buffer()
+
+        self.shards = []   # Manifest entries
+        self.writers = []  # Background writer threads
+        self.current = None
+
+    def _take_buffer(self):
+        data = self.buffer.getvalue().encode('utf-8')
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def _start_shard(self, code):
+        path = self.name_pattern.format(len(self.shards) + 1)
+        if self.writers:
+            self.writers[-1].lines.put(None)  # Let the previous shard finish in the background
+        self.writers.append(_ShardFile(path, self.header))
+        self.current = {"file": os.path.basename(path), "first_code": code, "last_code": code,
+                        "rows": 0, "bytes": len(self.header)}
+        self.shards.append(self.current)
+
+    def writerow(self, row):
+        """Add one row (same call as csv.DictWriter.writerow)."""
+        self.row_writer.writerow(row)
+        data = self._take_buffer()
+
+        shard = self.current
+        if (shard is None
+                or (self.max_rows and shard["rows"] >= self.max_rows)
+                or (self.max_bytes and shard["rows"] and shard["bytes"] + len(data) > self.max_bytes)):
+            self._start_shard(row["Code"])
+            shard = self.current
+
+        self.writers[-1].lines.put(data)
+        shard["last_code"] = row["Code"]
+        shard["rows"] += 1
+        shard["bytes"] += len(data)
+
+    def close(self):
+        """Wait for every shard to be written, then save the manifest. Returns the manifest path."""
+        if self.writers:
+            self.writers[-1].lines.put(None)
+        for writer in self.writers:
+            writer.join()
+            if writer.error is not None:
+                raise writer.error
+
+        manifest_path = shard_manifest_path_for(self.output_csv_path)
+        manifest = {"version": SHARD_MANIFEST_VERSION, "fieldnames": self.fieldnames, "shards": self.shards}
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path)
+        return manifest_path
@@ -0,0 +1,197 @@
+"""
+SQLite output backend for the extracted wave.
+
+main.py can write the same data as the CSV into a SQLite database: one row per
+university (W4.Num, Code) and one row per link (link number, file name, content),
+plus a full-text index on the content. Large texts then live in a database instead
+of giant CSV cells, and "which universities mention X" is answered by the index in
+milliseconds instead of by grepping the CSV.
+
+Run this file directly to search a database:
+    python sqlite_output.py ../outputCvs/output_wave3.db "mental health"
+"""
+
+import os
+import sys
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS universities (
+    code   TEXT PRIMARY KEY,
+    w4_num INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS links (
+    id         INTEGER PRIMARY KEY,
+    code       TEXT NOT NULL,
+    link_index INTEGER NOT NULL,
+    file_name  TEXT,
+    content    TEXT
+);
+CREATE INDEX IF NOT EXISTS links_code ON links (code, link_index);
+"""
+
+# External-content FTS table: the text is stored once, in links
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS links_fts USING fts5(content, content='links', content_rowid='id')"
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def is_sqlite_path(path):
+    """True if the path names a SQLite output instead of a CSV."""
+    return path.lower().endswith(SQLITE_SUFFIXES)
+
+
+def _has_fts(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'links_fts'").fetchone() is not None
+
+
+class SqliteRowWriter:
+    """
+    Writes university rows into a SQLite database in batched transactions.
+
+    A full rebuild (replace=True) writes into a temporary file that is moved over
+    the old database on close, so readers never see a half written database.
+    With replace=False the existing database is updated in place, which is what
+    incremental runs use.
+    """
+
+    def __init__(self, db_path, replace=True, batch_size=200):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.work_path = db_path + ".tmp" if replace else db_path
+        if replace and os.path.exists(self.work_path):
+            os.remove(self.work_path)
+        self.conn = sqlite3.connect(self.work_path)
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.execute(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            print("⚠️ SQLite was built without FTS5; full-text search will fall back to LIKE.")
+        self.fts = _has_fts(self.conn)
+        self.pending = 0
+        self.conn.execute("BEGIN")
+
+    def _delete_code(self, code):
+        if self.fts:
+            # External-content FTS rows must be removed with the old text
+            self.conn.execute(
+                "INSERT INTO links_fts (links_fts, rowid, content) "
+                "SELECT 'delete', id, content FROM links WHERE code = ?", (code,))
+        self.conn.execute("DELETE FROM links WHERE code = ?", (code,))
+        self.conn.execute("DELETE FROM universities WHERE code = ?", (code,))
+
+    def write_row(self, row, file_names):
+        """Insert (or replace) one university row; file_names lists its .txt files in link order."""
+        code = row["Code"]
+        self._delete_code(code)
+        self.conn.execute("INSERT INTO universities (code, w4_num) VALUES (?, ?)", (code, row["W4.Num"]))
+        for i, file_name in enumerate(file_names, start=1):
+            content = row.get(f"UniversityLink{i}", "")
+            cursor = self.conn.execute(
+                "INSERT INTO links (code, link_index, file_name, content) VALUES (?, ?, ?, ?)",
+                (code, i, file_name, content))
+            if self.fts:
+                self.conn.execute("INSERT INTO links_fts (rowid, content) VALUES (?, ?)",
+                                  (cursor.lastrowid, content))
+
+        # Commit in batches so a big wave is not one huge transaction
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.conn.execute("COMMIT")
+            self.conn.execute("BEGIN")
+            self.pending = 0
+
+    def remove_codes(self, codes):
+        """Delete the rows of universities that are no longer in the wave."""
+        for code in codes:
+            self._delete_code(code)
+
+    def renumber(self, row_numbers):
+        """Set W4.Num for every university from {code: W4.Num}."""
+        self.conn.executemany("UPDATE universities SET w4_num = ? WHERE code = ?",
+                              [(num, code) for code, num in row_numbers.items()])
+
+    def close(self):
+        self.conn.execute("COMMIT")
+        self.conn.close()
+        if self.work_path != self.db_path:
+            os.replace(self.work_path, self.db_path)
+
+
+def iter_rows(db_path):
+    """Yield rows shaped like the CSV's DictReader rows, in W4.Num order."""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(
+            "SELECT u.w4_num, u.code, l.link_index, l.content FROM universities u "
+            "LEFT JOIN links l ON l.code = u.code ORDER BY u.w4_num, l.link_index")
+        row = None
+        for w4_num, code, link_index, content in cursor:
+            if row is None or row["Code"] != code:
+                if row is not None:
+                    yield row
+                row = {"W4.Num": str(w4_num), "Code": code}
+            if link_index is not None:
+                row[f"UniversityLink{link_index}"] = content
+        if row is not None:
+            yield row
+    finally:
+        conn.close()
+
+
+def read_rows(db_path, codes):
+    """Return {code: row dict} for the given codes; missing codes are left out."""
+    rows = {}
+    conn = sqlite3.connect(db_path)
+    try:
+        for code in set(codes):
+            found = conn.execute("SELECT w4_num FROM universities WHERE code = ?", (code,)).fetchone()
+            if found is None:
+                continue
+            row = {"W4.Num": str(found[0]), "Code": code}
+            for link_index, content in conn.execute(
+                    "SELECT link_index, content FROM links WHERE code = ? ORDER BY link_index", (code,)):
+                row[f"UniversityLink{link_index}"] = content
+            rows[code] = row
+    finally:
+        conn.close()
+    return rows
+
+
+def count_rows(db_path):
+    """Number of universities in the database."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM universities").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def search(db_path, query, limit=100):
+    """
+    Find the links whose content matches a full-text query (FTS5 syntax, e.g. "mental health").
+    Returns a list of (code, link_index, file_name) sorted by relevance.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if _has_fts(conn):
+            cursor = conn.execute(
+                "SELECT l.code, l.link_index, l.file_name FROM links_fts f JOIN links l ON l.id = f.rowid "
+                "WHERE links_fts MATCH ? ORDER BY f.rank LIMIT ?", (query, limit))
+        else:
+            cursor = conn.execute(
+                "SELECT code, link_index, file_name FROM links WHERE content LIKE ? "
+                "ORDER BY code, link_index LIMIT ?", (f"%{query}%", limit))
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python sqlite_output.py <database> <query>")
+        sys.exit(2)
+    matches = search(sys.argv[1], sys.argv[2])
+    for code, link_index, file_name in matches:
+        print(f"{code}\tUniversityLink{link_index}\t{file_name}")
+    print(f"\n{len(matches)} matching link(s)")
@@ -0,0 +1,507 @@
+"""
+On-disk inverted index over the extracted page texts, with a query command.
+
+Every term maps to the pages it occurs in: (Code, link number, word positions).
+main.py fills the index in the same pass as the CSV when term_index_path is set
+(and patches it in incremental runs); an existing output can be indexed with
+
+    python term_index.py build ../outputCvs/output_wave3_content_ordered.csv ../outputCvs/wave3_terms
+
+and queried with
+
+    python term_index.py query ../outputCvs/wave3_terms 'counseling AND ("mental health" OR wellness) NOT athletics'
+
+Query syntax: words (case-insensitive), "quoted phrases", AND (also implied
+between words), OR, NOT and parentheses. Words are the \\w+ runs of the text, so
+"covid-19" is searched as the phrase "covid 19".
+
+Index folder layout:
+    index.json       doc id -> [code, link number], deleted doc ids, segment list
+    seg00001.idx     immutable segment files
+
+A segment holds a sorted table of fixed-size term records, the term bytes and the
+postings. Segments are opened with mmap and terms are found by binary search, so
+opening an index does not read it, and a query only touches the postings of its
+own terms. Per term, the postings are the doc ids (uint32), the start of each
+doc's positions (uint32) and the positions themselves as delta varints, which are
+only decoded for phrase queries.
+
+An update (write_row on an existing index) marks the old docs of the university
+as deleted and adds its new pages to a small new segment. Once there are more than
+max_segments segments, they are merged into one and the deleted docs dropped.
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import heapq
+import shutil
+import struct
+import argparse
+from array import array
+from collections import defaultdict
+
+import output_source
+import content_store
+
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+SEGMENT_MAGIC = b"TERMSEG1"
+
+_HEADER = struct.Struct("<8sQQQ")  # magic, term count, offset of the term bytes, offset of the postings
+_RECORD = struct.Struct("<QIQI")   # term offset, term length, postings offset, doc count
+_WORD = re.compile(r"\w+")
+_QUERY_TOKEN = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+_SWAP = sys.byteorder != "little"  # Segment files are little-endian
+
+
+def tokenize(text):
+    """Lower-cased words of a text, in order (the same rule for pages and queries)."""
+    return _WORD.findall(text.lower())
+
+
+def index_exists(index_dir):
+    return os.path.exists(os.path.join(index_dir, INDEX_FILE))
+
+
+def _u32(buffer):
+    values = array("I")
+    values.frombytes(buffer)
+    if _SWAP:
+        values.byteswap()
+    return values
+
+
+def _u32_bytes(values):
+    if _SWAP:
+        values = array("I", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_deltas(positions, out):
+    """Append ascending positions to out as varint deltas."""
+    previous = 0
+    for position in positions:
+        delta = position - previous
+        previous = position
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+
+
+def _decode_deltas(data):
+    positions = []
+    value = shift = previous = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            previous += value
+            positions.append(previous)
+            value = shift = 0
+    return positions
+
+
+def _write_segment(path, terms):
+    """
+    Write a segment from (term bytes, doc ids, position starts, position bytes) tuples in
+    sorted term order. Postings go to a side file first, so merges never hold them all in memory.
+    """
+    records = []
+    term_bytes = bytearray()
+    postings_path = path + ".postings.tmp"
+    with open(postings_path, "wb") as postings:
+        offset = 0
+        for term, docs, starts, blob in terms:
+            records.append(_RECORD.pack(len(term_bytes), len(term), offset, len(docs)))
+            term_bytes += term
+            data = _u32_bytes(docs) + _u32_bytes(starts) + bytes(blob)
+            data += b"\0" * (-len(data) % 4)  # Keep every postings block 4-byte aligned
+            postings.write(data)
+            offset += len(data)
+
+    terms_at = _HEADER.size + len(records) * _RECORD.size
+    postings_at = terms_at + len(term_bytes) + (-(terms_at + len(term_bytes)) % 4)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f, open(postings_path, "rb") as postings:
+        f.write(_HEADER.pack(SEGMENT_MAGIC, len(records), terms_at, postings_at))
+        f.write(b"".join(records))
+        f.write(term_bytes)
+        f.write(b"\0" * (postings_at - terms_at - len(term_bytes)))
+        shutil.copyfileobj(postings, f, 1 << 20)
+    os.remove(postings_path)
+    os.replace(tmp_path, path)
+
+
+class _Segment:
+    """A memory-mapped segment file."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.term_count, self.terms_at, self.postings_at = _HEADER.unpack_from(self.map, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a term index segment")
+
+    def _entry(self, i):
+        """(term bytes, postings offset, doc count) of the i-th term."""
+        term_offset, term_length, postings_offset, doc_count = _RECORD.unpack_from(
+            self.map, _HEADER.size + i * _RECORD.size)
+        start = self.terms_at + term_offset
+        return self.map[start:start + term_length], postings_offset, doc_count
+
+    def _postings(self, postings_offset, doc_count, with_positions=True):
+        start = self.postings_at + postings_offset
+        docs = _u32(self.map[start:start + 4 * doc_count])
+        if not with_positions:
+            return docs, None, None
+        starts = _u32(self.map[start + 4 * doc_count:start + 8 * doc_count + 4])
+        blob_at = start + 8 * doc_count + 4
+        return docs, starts, self.map[blob_at:blob_at + starts[-1]]
+
+    def find(self, term, with_positions=True):
+        """(doc ids, position starts, position bytes) of a term, or None if it is not in the segment."""
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            found, postings_offset, doc_count = self._entry(middle)
+            if found < term:
+                low = middle + 1
+            elif found > term:
+                high = middle
+            else:
+                return self._postings(postings_offset, doc_count, with_positions)
+        return None
+
+    def terms(self):
+        """Yield (term bytes, doc ids, position starts, position bytes) in term order."""
+        for i in range(self.term_count):
+            term, postings_offset, doc_count = self._entry(i)
+            yield (term, *self._postings(postings_offset, doc_count))
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def _load_state(index_dir):
+    with open(os.path.join(index_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != INDEX_VERSION:
+        raise ValueError(f"{index_dir} was written by another version of term_index.py; rebuild it")
+    return state
+
+
+def _save_state(index_dir, state):
+    path = os.path.join(index_dir, INDEX_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class TermIndexWriter:
+    """
+    Adds university rows to a term index, like SqliteRowWriter does for the database.
+
+    replace=True builds a new index in a temporary folder that replaces the old one
+    on close. replace=False updates an existing index: write_row replaces every page
+    of that university and remove_codes drops universities. Pages are collected in
+    memory and written as a segment every segment_max_words words.
+    """
+
+    def __init__(self, index_dir, replace=True, max_segments=8, segment_max_words=2_000_000):
+        self.index_dir = index_dir
+        self.max_segments = max_segments
+        self.segment_max_words = segment_max_words
+        self.work_dir = index_dir + ".tmp" if replace else index_dir
+        if replace:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            os.makedirs(self.work_dir)
+            self.state = {"version": INDEX_VERSION, "docs": [], "deleted": [], "segments": [], "next_segment": 1}
+        else:
+            self.state = _load_state(index_dir)
+        self.deleted = set(self.state["deleted"])
+        self.code_docs = defaultdict(list)  # code -> live doc ids
+        for doc_id, doc in enumerate(self.state["docs"]):
+            if doc is not None and doc_id not in self.deleted:
+                self.code_docs[doc[0]].append(doc_id)
+        self.terms = {}  # term -> (doc ids, position starts, position bytes) of the pending segment
+        self.words = 0
+
+    def _delete_code(self, code):
+        self.deleted.update(self.code_docs.pop(code, ()))
+
+    def write_row(self, row):
+        """Index (or re-index) every non-empty page of one university row. Texts must not be store references."""
+        code = row["Code"]
+        self._delete_code(code)
+        for key, text in row.items():
+            if not key.startswith("UniversityLink") or not text or text == "ERROR_READING_FILE":
+                continue
+            doc_id = len(self.state["docs"])
+            self.state["docs"].append([code, int(key[len("UniversityLink"):])])
+            self.code_docs[code].append(doc_id)
+
+            positions = defaultdict(list)
+            words = tokenize(text)
+            for position, word in enumerate(words):
+                positions[word].append(position)
+            for term, term_positions in positions.items():
+                entry = self.terms.get(term)
+                if entry is None:
+                    entry = self.terms[term] = (array("I"), array("I", [0]), bytearray())
+                docs, starts, blob = entry
+                docs.append(doc_id)
+                _encode_deltas(term_positions, blob)
+                starts.append(len(blob))
+            self.words += len(words)
+        if self.words >= self.segment_max_words:
+            self._flush()
+
+    def remove_codes(self, codes):
+        """Drop the pages of universities that are no longer in the wave."""
+        for code in codes:
+            self._delete_code(code)
+
+    def _flush(self):
+        """Write the pending pages as a new segment."""
+        if not self.terms:
+            return
+        name = f"seg{self.state['next_segment']:05d}.idx"
+        self.state["next_segment"] += 1
+        encoded = sorted((term.encode("utf-8"), *entry) for term, entry in self.terms.items())
+        _write_segment(os.path.join(self.work_dir, name), encoded)
+        self.state["segments"].append(name)
+        self.terms = {}
+        self.words = 0
+
+    def close(self):
+        self._flush()
+        self.state["deleted"] = sorted(self.deleted)
+        _save_state(self.work_dir, self.state)
+        # A fresh build is merged into a single segment; updates only once segments pile up
+        if len(self.state["segments"]) > (1 if self.work_dir != self.index_dir else self.max_segments):
+            merge_segments(self.work_dir)
+        if self.work_dir != self.index_dir:
+            old_dir = self.index_dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(self.index_dir):
+                os.rename(self.index_dir, old_dir)
+            os.rename(self.work_dir, self.index_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def merge_segments(index_dir):
+    """Merge every segment of an index into one and drop the deleted docs."""
+    state = _load_state(index_dir)
+    deleted = set(state["deleted"])
+    segments = [_Segment(os.path.join(index_dir, name)) for name in state["segments"]]
+
+    def merged_terms():
+        # Segments hold increasing doc ids in list order, so concatenating keeps every term's docs sorted
+        streams = [((term, n, docs, starts, blob) for term, docs, starts, blob in segment.terms())
+                   for n, segment in enumerate(segments)]
+        current = None
+        for term, _, docs, starts, blob in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+            if current is None or current[0] != term:
+                if current is not None and current[1]:
+                    yield current
+                current = (term, array("I"), array("I", [0]), bytearray())
+            for i, doc_id in enumerate(docs):
+                if doc_id not in deleted:
+                    current[1].append(doc_id)
+                    current[3].extend(blob[starts[i]:starts[i + 1]])
+                    current[2].append(len(current[3]))
+        if current is not None and current[1]:
+            yield current
+
+    name = f"seg{state['next_segment']:05d}.idx"
+    try:
+        _write_segment(os.path.join(index_dir, name), merged_terms())
+    finally:
+        for segment in segments:
+            segment.close()
+
+    old_names = state["segments"]
+    for doc_id in deleted:
+        state["docs"][doc_id] = None
+    state.update(deleted=[], segments=[name], next_segment=state["next_segment"] + 1)
+    _save_state(index_dir, state)
+    for old_name in old_names:
+        os.remove(os.path.join(index_dir, old_name))
+
+
+class TermIndex:
+    """Read-only view of an index folder; search() answers term, phrase and boolean queries."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        state = _load_state(index_dir)
+        self.docs = state["docs"]
+        self.deleted = set(state["deleted"])
+        self.segments = [_Segment(os.path.join(index_dir, name)) for name in state["segments"]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def _live(self):
+        return {doc_id for doc_id, doc in enumerate(self.docs) if doc is not None} - self.deleted
+
+    def _term_docs(self, term):
+        found = set()
+        for segment in self.segments:
+            postings = segment.find(term.encode("utf-8"), with_positions=False)
+            if postings is not None:
+                found.update(postings[0])
+        return found - self.deleted
+
+    def _phrase_docs(self, words):
+        """Docs where the words occur next to each other, in order."""
+        found = set()
+        encoded = [word.encode("utf-8") for word in words]
+        for segment in self.segments:
+            postings = []
+            for term in encoded:
+                entry = segment.find(term)
+                if entry is None:
+                    break
+                docs, starts, blob = entry
+                postings.append(({doc_id: i for i, doc_id in enumerate(docs)}, starts, blob))
+            else:
+                candidates = set(postings[0][0]).intersection(*(p[0] for p in postings[1:])) - self.deleted
+                for doc_id in candidates:
+                    # Positions of word k shifted back by k: a phrase start is in every set
+                    starts_in_doc = None
+                    for k, (rows, starts, blob) in enumerate(postings):
+                        i = rows[doc_id]
+                        shifted = {p - k for p in _decode_deltas(blob[starts[i]:starts[i + 1]])}
+                        starts_in_doc = shifted if starts_in_doc is None else starts_in_doc & shifted
+                        if not starts_in_doc:
+                            break
+                    if starts_in_doc:
+                        found.add(doc_id)
+        return found
+
+    def _words(self, text):
+        words = tokenize(text)
+        if not words:
+            return set()
+        return self._term_docs(words[0]) if len(words) == 1 else self._phrase_docs(words)
+
+    def search(self, query):
+        """Return the sorted (code, link number) pairs of the pages that match a query."""
+        tokens = _QUERY_TOKEN.findall(query)
+        position = 0
+
+        def peek():
+            return tokens[position] if position < len(tokens) else None
+
+        def take():
+            nonlocal position
+            position += 1
+            return tokens[position - 1]
+
+        def parse_or():
+            result = parse_and()
+            while peek() == "OR":
+                take()
+                result = result | parse_and()
+            return result
+
+        def parse_and():
+            result = parse_not()
+            while peek() not in (None, ")", "OR"):
+                if peek() == "AND":
+                    take()
+                result = result & parse_not()
+            return result
+
+        def parse_not():
+            if peek() == "NOT":
+                take()
+                return self._live() - parse_not()
+            return parse_atom()
+
+        def parse_atom():
+            token = peek()
+            if token is None or token in (")", "AND", "OR"):
+                raise ValueError(f"Unexpected {'end of query' if token is None else repr(token)} in: {query}")
+            take()
+            if token == "(":
+                result = parse_or()
+                if peek() != ")":
+                    raise ValueError(f"Missing ')' in: {query}")
+                take()
+                return result
+            return self._words(token.strip('"'))
+
+        if not tokens:
+            return []
+        matches = parse_or()
+        if peek() is not None:
+            raise ValueError(f"Unexpected {peek()!r} in: {query}")
+        return sorted(tuple(self.docs[doc_id]) for doc_id in matches)
+
+
+def build_index(output_path, index_dir, store_dir=None):
+    """Index every row of an existing output (CSV, compressed CSV, .db or shard manifest). Returns the row count."""
+    store = content_store.LazyStore(output_path, store_dir)  # Only opened if a cell holds a reference
+    writer = TermIndexWriter(index_dir)
+    rows = 0
+    for row in output_source.iter_output_rows(output_path):
+        writer.write_row(content_store.expand_row(row, store))
+        rows += 1
+    writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query an inverted index of the page texts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Index an existing output")
+    build.add_argument("output", help="Output CSV (or .db, or shard manifest)")
+    build.add_argument("index_dir", help="Index folder to create")
+    build.add_argument("--store", help="Content store folder, if the CSV holds sha256: references "
+                       "(default: content_store next to the output)")
+    query = subparsers.add_parser("query", help="Find the pages that match a query")
+    query.add_argument("index_dir")
+    query.add_argument("query", help='e.g. counseling AND ("mental health" OR wellness) NOT athletics')
+    compact = subparsers.add_parser("compact", help="Merge all segments into one")
+    compact.add_argument("index_dir")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    if args.command == "build":
+        rows = build_index(args.output, args.index_dir, args.store)
+        print(f"Indexed {rows} universities into {args.index_dir} in {time.perf_counter() - start_time:.2f}s")
+    elif args.command == "compact":
+        merge_segments(args.index_dir)
+        print(f"Merged the segments of {args.index_dir}")
+    else:
+        try:
+            with TermIndex(args.index_dir) as index:
+                matches = index.search(args.query)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(2)
+        links = defaultdict(list)
+        for code, link in matches:
+            links[code].append(f"UniversityLink{link}")
+        for code, code_links in links.items():
+            print(f"{code}\t{' '.join(code_links)}")
+        print(f"\n{len(matches)} matching link(s) in {len(links)} universities "
+              f"({(time.perf_counter() - start_time) * 1000:.1f} ms)")
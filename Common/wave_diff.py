@@ -0,0 +1,70 @@
+"""
+Per-university diff between two waves, computed from content digests.
+
+Both sides are the "folders" part of a wave manifest (see wave_manifest.py):
+{code: {txt name: {"size", "mtime_ns", "sha256"}}}. Pages are compared by file
+name and SHA-256 only, so no text is ever loaded or compared cell by cell.
+
+Each university gets one of these statuses:
+    added      only in the new wave
+    removed    only in the old wave
+    changed    pages were added, removed or edited
+    reordered  the same page contents, saved under different file names
+    unchanged  every page has the same name and digest
+"""
+
+import os
+import csv
+
+DIFF_FIELDNAMES = ["Code", "Status", "AddedPages", "RemovedPages", "ChangedPages"]
+
+
+def diff_university(old_files, new_files):
+    """Compare one university's {txt name: record} maps. Returns (status, added, removed, changed)."""
+    added = sorted(set(new_files) - set(old_files))
+    removed = sorted(set(old_files) - set(new_files))
+    changed = sorted(name for name in set(old_files) & set(new_files)
+                     if old_files[name].get("sha256") != new_files[name].get("sha256"))
+    if not (added or removed or changed):
+        return "unchanged", added, removed, changed
+
+    # Same pages, only saved under other numbers (e.g. a page inserted and another dropped)
+    old_digests = sorted(record.get("sha256") or "" for record in old_files.values())
+    new_digests = sorted(record.get("sha256") or "" for record in new_files.values())
+    status = "reordered" if old_digests == new_digests else "changed"
+    return status, added, removed, changed
+
+
+def diff_waves(old_folders, new_folders):
+    """Yield one diff dict (DIFF_FIELDNAMES keys, page lists as lists) per university, by code."""
+    for code in sorted(set(old_folders) | set(new_folders)):
+        if code not in old_folders:
+            yield {"Code": code, "Status": "added", "AddedPages": sorted(new_folders[code]),
+                   "RemovedPages": [], "ChangedPages": []}
+        elif code not in new_folders:
+            yield {"Code": code, "Status": "removed", "AddedPages": [],
+                   "RemovedPages": sorted(old_folders[code]), "ChangedPages": []}
+        else:
+            status, added, removed, changed = diff_university(old_folders[code], new_folders[code])
+            yield {"Code": code, "Status": status, "AddedPages": added,
+                   "RemovedPages": removed, "ChangedPages": changed}
+
+
+def write_diff_csv(diff_csv_path, diffs, include_unchanged=False):
+    """
+    Write diffs to a CSV (page lists joined with spaces) atomically.
+    Returns {status: count} over all diffs, including the unchanged ones that were not written.
+    """
+    counts = {}
+    tmp_path = diff_csv_path + ".tmp"
+    with open(tmp_path, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DIFF_FIELDNAMES)
+        writer.writeheader()
+        for diff in diffs:
+            counts[diff["Status"]] = counts.get(diff["Status"], 0) + 1
+            if diff["Status"] == "unchanged" and not include_unchanged:
+                continue
+            writer.writerow({key: " ".join(value) if isinstance(value, list) else value
+                             for key, value in diff.items()})
+    os.replace(tmp_path, diff_csv_path)
+    return counts
@@ -0,0 +1,158 @@
+"""
+Sidecar manifest of the source .txt files behind an output CSV.
+
+The manifest records, for every university folder, the size, modification time
+and SHA-256 digest of each .txt file that went into the CSV. On the next run the
+tree only needs to be stat'ed (see wave_scanner.WaveSnapshot.stat_map): folders
+whose files still have the same size and mtime are left alone, and only changed,
+added or removed folders are re-read and patched into the existing CSV.
+
+Manifest layout (JSON, saved next to the CSV as "<csv>.manifest.json"):
+{
+    "version": 1,
+    "wave_path": "/path/to/2021UniversityFiles",
+    "csv": {"size": 123, "mtime_ns": 456},
+    "folders": {
+        "adelphi": {"1.txt": {"size": 10, "mtime_ns": 789, "sha256": "..."}, ...},
+        ...
+    }
+}
+"""
+
+import os
+import csv
+import sys
+import json
+import hashlib
+
+import compressed_io
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_path_for(output_csv_path):
+    """Return the sidecar manifest path for an output CSV."""
+    return output_csv_path + MANIFEST_SUFFIX
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def decode_text(raw):
+    """
+    Decode raw file bytes exactly like open(path, 'r', encoding='utf-8').read():
+    strict UTF-8 plus universal-newline translation.
+    """
+    return raw.decode('utf-8').replace("\r\n", "\n").replace("\r", "\n")
+
+
+def load_manifest(manifest_path, wave_path, output_csv_path):
+    """
+    Load a manifest if it is still usable for this wave and CSV, otherwise None.
+    A manifest is discarded when it is missing or corrupt, was built from another
+    wave folder, or the CSV was modified after the manifest was written.
+    """
+    if not os.path.exists(manifest_path) or not os.path.exists(output_csv_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    if manifest.get("wave_path") != os.path.abspath(wave_path):
+        return None
+    st = os.stat(output_csv_path)
+    if manifest.get("csv") != {"size": st.st_size, "mtime_ns": st.st_mtime_ns}:
+        return None
+    return manifest
+
+
+def save_manifest(manifest_path, wave_path, output_csv_path, folders):
+    """Write the manifest atomically, stamping it with the current CSV size and mtime."""
+    st = os.stat(output_csv_path)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "wave_path": os.path.abspath(wave_path),
+        "csv": {"size": st.st_size, "mtime_ns": st.st_mtime_ns},
+        "folders": folders,
+    }
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def changed_folders(snapshot, manifest):
+    """
+    Compare a stat snapshot ({folder: {txt name: (size, mtime_ns)}}) against a manifest.
+    Returns (added, removed, changed) as sorted lists of folder names; a folder is
+    "changed" when its set of .txt files, or any file's size or mtime, differs.
+    """
+    old_folders = manifest["folders"]
+    added = sorted(set(snapshot) - set(old_folders))
+    removed = sorted(set(old_folders) - set(snapshot))
+    changed = []
+    for folder_name in sorted(set(snapshot) & set(old_folders)):
+        old_files = old_folders[folder_name]
+        new_files = snapshot[folder_name]
+        if set(old_files) != set(new_files):
+            changed.append(folder_name)
+            continue
+        for txt_file, (size, mtime_ns) in new_files.items():
+            record = old_files[txt_file]
+            if record["size"] != size or record["mtime_ns"] != mtime_ns:
+                changed.append(folder_name)
+                break
+    return added, removed, changed
+
+
+def patch_output_csv(output_csv_path, fieldnames, new_rows, removed_codes, row_numbers):
+    """
+    Rewrite an existing output CSV with some university rows replaced.
+
+    new_rows:      {code: row dict} for added or changed universities
+    removed_codes: codes whose rows must be dropped
+    row_numbers:   {code: W4.Num} for every university in the new layout
+
+    The old file is streamed row by row and merged with the new rows in Code
+    order, so only one old row is in memory at a time. The result is written to
+    a temporary file and moved over the original, so readers never see a half
+    written CSV.
+    """
+    csv.field_size_limit(sys.maxsize)  # Handle large text fields
+
+    pending = sorted(new_rows)  # Codes still to be inserted, alphabetical
+    tmp_path = output_csv_path + ".tmp"
+    with compressed_io.open_csv(output_csv_path) as old_file, \
+            compressed_io.open_csv(tmp_path, 'w', compressed_io.compression_for(output_csv_path)) as new_file:
+        reader = csv.DictReader(old_file)
+        writer = csv.DictWriter(new_file, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+
+        def write(row):
+            row["W4.Num"] = row_numbers[row["Code"]]
+            writer.writerow(row)
+
+        for row in reader:
+            code = row["Code"]
+            # Insert any new rows that sort before this one
+            while pending and pending[0] < code:
+                write(new_rows[pending.pop(0)])
+            if code in new_rows or code in removed_codes or code not in row_numbers:
+                continue  # Replaced, removed, or no longer part of the wave
+            write(row)
+
+        for code in pending:
+            write(new_rows[code])
+
+    os.replace(tmp_path, output_csv_path)
@@ -0,0 +1,191 @@
+"""
+Shared directory scanner for a wave folder.
+
+Every script needs the same picture of the input tree: the university folders
+and the .txt files inside them. scan_wave walks the tree once with os.scandir,
+whose entries already know whether they are files or folders, so the only extra
+system call is one stat per .txt file (for its size and mtime). On a network
+mount this replaces the listdir + isdir/isfile round trips each script used to
+make on its own.
+
+The snapshot can be saved to disk and reused by the next script of the same run:
+set the WAVE_SNAPSHOT environment variable to a file path, e.g.
+
+    export WAVE_SNAPSHOT=/tmp/wave3_snapshot.json
+    python MainProgram/main.py                      # scans the tree and saves the snapshot
+    python VerificationProgram/run_all_checks.py    # reuses it instead of walking the tree again
+
+A saved snapshot is only reused for the same wave folder and for at most
+WAVE_SNAPSHOT_MAX_AGE seconds (default 3600).
+"""
+
+import os
+import json
+import time
+
+SNAPSHOT_VERSION = 1
+DEFAULT_MAX_AGE = 3600  # Seconds a saved snapshot may be reused
+
+_memory_cache = {}  # Snapshots already taken by this process, by absolute wave path
+
+
+class WaveSnapshot:
+    """
+    The university folders of a wave and the .txt entries inside each of them.
+
+    folders maps folder name -> {txt name: [size, mtime_ns, is_file]} for the .txt
+    entries directly inside the folder; nested maps folder name -> sorted relative
+    paths of .txt files in its subfolders.
+    """
+
+    def __init__(self, wave_path, folders, nested, created=None):
+        self.wave_path = wave_path
+        self.folders = folders
+        self.nested = nested
+        self.created = created if created is not None else time.time()
+
+    def folder_names(self):
+        """University folders, sorted alphabetically."""
+        return sorted(self.folders)
+
+    def txt_files(self, folder_name, files_only=False):
+        """Sorted .txt names directly inside a folder; files_only drops anything that is not a regular file."""
+        entries = self.folders.get(folder_name, {})
+        return sorted(name for name, (_, _, is_file) in entries.items() if is_file or not files_only)
+
+    def all_txt_names(self, folder_name):
+        """Names of every .txt file in a folder, including those in subfolders."""
+        names = set(self.txt_files(folder_name, files_only=True))
+        names.update(os.path.basename(path) for path in self.nested.get(folder_name, []))
+        return names
+
+    def stat_map(self, files_only=False):
+        """{folder: {txt name: (size, mtime_ns)}}, the shape wave_manifest compares against."""
+        return {folder: {name: (size, mtime_ns) for name, (size, mtime_ns, is_file) in entries.items()
+                         if is_file or not files_only}
+                for folder, entries in self.folders.items()}
+
+    def to_dict(self):
+        return {"version": SNAPSHOT_VERSION, "wave_path": self.wave_path, "created": self.created,
+                "folders": self.folders, "nested": self.nested}
+
+
+def _scan_nested(folder_path, prefix, found):
+    """Collect the relative paths of .txt files in the subfolders of a university folder."""
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                _scan_nested(entry.path, prefix + entry.name + "/", found)
+            elif entry.name.endswith(".txt") and prefix:
+                found.append(prefix + entry.name)
+
+
+def _scan_university(folder_path):
+    """Return ({txt name: [size, mtime_ns, is_file]}, sorted nested .txt paths) for one university folder."""
+    entries = {}
+    nested_txt = []
+    with os.scandir(folder_path) as files:
+        for entry in files:
+            if entry.name.endswith(".txt"):
+                try:
+                    st = entry.stat()
+                    entries[entry.name] = [st.st_size, st.st_mtime_ns, entry.is_file()]
+                except OSError:
+                    entries[entry.name] = [-1, -1, False]  # Unreadable entries always count as changed
+            if entry.is_dir():
+                _scan_nested(entry.path, entry.name + "/", nested_txt)
+    return entries, sorted(nested_txt)
+
+
+def scan_wave(wave_path):
+    """Walk the wave folder (or list the wave archive, see wave_source.py) once and return a WaveSnapshot."""
+    wave_path = os.path.abspath(wave_path)
+    import wave_source  # Imported here because wave_source builds on this module
+    if wave_source.is_archive(wave_path):
+        return wave_source.scan_archive(wave_path)
+    folders = {}
+    nested = {}
+    with os.scandir(wave_path) as universities:
+        for university in universities:
+            if not university.is_dir():
+                continue
+            folders[university.name], nested_txt = _scan_university(university.path)
+            if nested_txt:
+                nested[university.name] = nested_txt
+    return WaveSnapshot(wave_path, folders, nested)
+
+
+def scan_folders(wave_path, folder_names):
+    """
+    Scan only the named university folders and return a partial WaveSnapshot.
+    Names that are no longer folders are left out, so they show up as removed.
+    """
+    wave_path = os.path.abspath(wave_path)
+    import wave_source
+    if wave_source.is_archive(wave_path):
+        snapshot = wave_source.scan_archive(wave_path)
+        return WaveSnapshot(wave_path, {name: snapshot.folders[name] for name in folder_names
+                                        if name in snapshot.folders},
+                            {name: snapshot.nested[name] for name in folder_names if name in snapshot.nested})
+    folders = {}
+    nested = {}
+    for folder_name in folder_names:
+        folder_path = os.path.join(wave_path, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+        folders[folder_name], nested_txt = _scan_university(folder_path)
+        if nested_txt:
+            nested[folder_name] = nested_txt
+    return WaveSnapshot(wave_path, folders, nested)
+
+
+def save_snapshot(snapshot, cache_path):
+    """Save a snapshot to disk atomically."""
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot.to_dict(), f)
+    os.replace(tmp_path, cache_path)
+
+
+def load_snapshot(cache_path, wave_path, max_age=DEFAULT_MAX_AGE):
+    """Load a saved snapshot if it belongs to this wave folder and is recent enough, otherwise None."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != SNAPSHOT_VERSION or data.get("wave_path") != os.path.abspath(wave_path):
+        return None
+    if time.time() - data.get("created", 0) > max_age:
+        return None
+    return WaveSnapshot(data["wave_path"], data["folders"], data.get("nested", {}), data["created"])
+
+
+def get_snapshot(wave_path, refresh=False, cache_path=None):
+    """
+    Return a snapshot of the wave folder, reusing one when possible.
+
+    Reuses, in order: a snapshot already taken by this process, then the file named
+    by cache_path (default: the WAVE_SNAPSHOT environment variable). refresh=True
+    always walks the tree again, which is what the extraction scripts use so that
+    change detection never works from stale data. A fresh scan is saved to the
+    cache file, if one is configured, for the scripts that run after.
+    """
+    wave_path = os.path.abspath(wave_path)
+    if cache_path is None:
+        cache_path = os.environ.get("WAVE_SNAPSHOT")
+    max_age = float(os.environ.get("WAVE_SNAPSHOT_MAX_AGE", DEFAULT_MAX_AGE))
+
+    if not refresh:
+        snapshot = _memory_cache.get(wave_path)
+        if snapshot is None and cache_path:
+            snapshot = load_snapshot(cache_path, wave_path, max_age)
+        if snapshot is not None:
+            _memory_cache[wave_path] = snapshot
+            return snapshot
+
+    snapshot = scan_wave(wave_path)
+    _memory_cache[wave_path] = snapshot
+    if cache_path:
+        save_snapshot(snapshot, cache_path)
+    return snapshot
@@ -0,0 +1,249 @@
+"""
+Access to the source .txt files of a wave, from a folder tree or straight from an archive.
+
+A wave root can be a folder (as before) or a .zip / .tar / .tar.gz / .tgz /
+.tar.bz2 / .tar.xz archive with the same layout inside, optionally below one top
+folder (e.g. "2021UniversityFiles/adelphi/1.txt"). Archives are never unpacked to
+disk: wave_scanner.scan_wave lists their members like a folder tree, and
+read_source / open_source return a member's bytes.
+
+- .zip and plain .tar: members are read directly by offset, each reader thread
+  with its own handle, in whatever order the scripts ask for them.
+- compressed tars can only be read front to back. Members are streamed in
+  archive order; a member that is needed later than it comes in the stream is
+  kept in memory until it is read. For an archive written in sorted order
+  (tar --sort=name, or any zip) that is at most one folder; otherwise a warning
+  is printed, because the buffer can grow up to the whole wave.
+
+macOS metadata (__MACOSX/ folders and ._ files) inside archives is ignored.
+An opened archive is reused until its size or mtime changes; a replaced archive
+is indexed again, so long-running processes (watch mode, batch_waves.py) never
+read a stale copy.
+"""
+
+import io
+import os
+import time
+import hashlib
+import tarfile
+import zipfile
+import threading
+
+import wave_scanner
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+COMPRESSED_TAR_SUFFIXES = ARCHIVE_SUFFIXES[2:]
+
+_archives = {}  # Open archives by absolute path (re-opened when the file changes)
+_archives_lock = threading.Lock()
+
+
+def is_archive(path):
+    """True if a wave root is an archive instead of a folder."""
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _split_members(names):
+    """
+    Map archive member names to (university, relative path) pairs.
+    Strips one common top folder when the universities sit below it.
+    Returns {member name: (university, path inside the university folder)}.
+    """
+    cleaned = {}
+    for name in names:
+        path = name.replace("\\", "/").strip("/")
+        while path.startswith("./"):
+            path = path[2:]
+        parts = path.split("/")
+        if path in ("", ".") or parts[0] == "__MACOSX" or parts[-1].startswith("._"):
+            continue
+        cleaned[name] = parts
+
+    tops = {parts[0] for parts in cleaned.values()}
+    if len(tops) == 1 and any(len(parts) >= 3 and parts[-1].endswith(".txt") for parts in cleaned.values()):
+        cleaned = {name: parts[1:] for name, parts in cleaned.items() if len(parts) > 1}
+    return {name: (parts[0], "/".join(parts[1:])) for name, parts in cleaned.items()}
+
+
+class _ArchiveWave:
+    """Common part of the archive readers: the member index and the snapshot."""
+
+    def __init__(self, path):
+        self.path = path
+        st = os.stat(path)
+        self.file_stat = (st.st_size, st.st_mtime_ns)  # Of the archive file when it was indexed
+        self.members = {}     # (university, txt name) -> member info, direct .txt files only
+        self.stats = {}       # (university, txt name) -> (size, mtime_ns)
+        self.folders = {}     # university -> {txt name: [size, mtime_ns, is_file]}
+        self.nested = {}      # university -> .txt paths in its subfolders
+        self.order = []       # Keys in archive order
+
+    def _index(self, entries):
+        """entries: (member name, is_dir, size, mtime_ns, info) in archive order."""
+        entries = list(entries)
+        split = _split_members([name for name, *_ in entries])
+        for name, is_dir, size, mtime_ns, info in entries:
+            if name not in split:
+                continue
+            university, rel_path = split[name]
+            if not rel_path and not is_dir:
+                continue  # A loose file next to the university folders
+            entries_of = self.folders.setdefault(university, {})
+            if is_dir or not rel_path.endswith(".txt"):
+                continue
+            if "/" in rel_path:
+                self.nested.setdefault(university, []).append(rel_path)
+                continue
+            entries_of[rel_path] = [size, mtime_ns, True]
+            self.members[(university, rel_path)] = info
+            self.stats[(university, rel_path)] = (size, mtime_ns)
+            self.order.append((university, rel_path))
+        for paths in self.nested.values():
+            paths.sort()
+
+    def snapshot(self):
+        return wave_scanner.WaveSnapshot(self.path, self.folders, self.nested)
+
+    def stat(self, folder_name, file_name):
+        try:
+            return self.stats[(folder_name, file_name)]
+        except KeyError:
+            raise FileNotFoundError(f"{folder_name}/{file_name} is not in {self.path}") from None
+
+
+class _ZipWave(_ArchiveWave):
+    def __init__(self, path):
+        super().__init__(path)
+        self.local = threading.local()
+        with zipfile.ZipFile(path) as zf:
+            self._index((info.filename, info.is_dir(), info.file_size,
+                         int(time.mktime(info.date_time + (0, 0, -1)) * 1e9), info)
+                        for info in zf.infolist())
+
+    def open(self, folder_name, file_name):
+        self.stat(folder_name, file_name)  # FileNotFoundError for unknown members
+        if not hasattr(self.local, "zip"):
+            self.local.zip = zipfile.ZipFile(self.path)  # One handle per reader thread
+        return self.local.zip.open(self.members[(folder_name, file_name)])
+
+
+class _TarWave(_ArchiveWave):
+    def __init__(self, path):
+        super().__init__(path)
+        self.local = threading.local()
+        with tarfile.open(path, mode='r:') as tf:
+            self._index((member.name, member.isdir(), member.size, int(member.mtime * 1e9), member)
+                        for member in tf if member.isfile() or member.isdir())
+
+    def open(self, folder_name, file_name):
+        self.stat(folder_name, file_name)
+        if not hasattr(self.local, "tar"):
+            self.local.tar = tarfile.open(self.path, mode='r:')  # One handle per reader thread
+        return self.local.tar.extractfile(self.members[(folder_name, file_name)])
+
+
+class _StreamedTarWave(_ArchiveWave):
+    """A compressed tar, read front to back with a buffer for members that are needed later."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        with tarfile.open(path, mode='r|*') as tf:
+            self._index((member.name, member.isdir(), member.size, int(member.mtime * 1e9), member.name)
+                        for member in tf if member.isfile() or member.isdir())
+        self.keys = {name: key for key, name in self.members.items()}
+        if self.order != sorted(self.order):
+            print(f"⚠️ {path} is not stored in sorted order, so members are buffered in memory until "
+                  "they are read. Recreate it with 'tar --sort=name' or use a .zip to avoid that.")
+        self.lock = threading.Lock()
+        self.buffer = {}
+        self.stream = None
+
+    def _advance(self, key):
+        """Read the stream up to the wanted member, buffering the others. Returns its bytes or None at the end."""
+        while True:
+            member = self.stream.next()  # Not a for loop: iterating again would restart from the first member
+            if member is None:
+                return None
+            member_key = self.keys.get(member.name)
+            if member_key is None or not member.isfile():
+                continue
+            data = self.stream.extractfile(member).read()
+            if member_key == key:
+                return data
+            self.buffer[member_key] = data
+
+    def open(self, folder_name, file_name):
+        key = (folder_name, file_name)
+        self.stat(folder_name, file_name)
+        with self.lock:
+            data = self.buffer.pop(key, None)
+            if data is None and self.stream is not None:
+                data = self._advance(key)
+            if data is None:
+                # Not ahead in the stream (e.g. read a second time): start again from the top
+                if self.stream is not None:
+                    self.stream.close()
+                self.stream = tarfile.open(self.path, mode='r|*')
+                data = self._advance(key)
+            if data is None:
+                raise FileNotFoundError(f"{folder_name}/{file_name} could not be read from {self.path}")
+        return io.BytesIO(data)
+
+
+def get_archive(archive_path):
+    """Return the (cached) reader of an archive, opened again if the file changed since it was indexed."""
+    archive_path = os.path.abspath(archive_path)
+    st = os.stat(archive_path)
+    with _archives_lock:
+        archive = _archives.get(archive_path)
+        if archive is None or archive.file_stat != (st.st_size, st.st_mtime_ns):
+            lowered = archive_path.lower()
+            if lowered.endswith(".zip"):
+                archive = _ZipWave(archive_path)
+            elif lowered.endswith(COMPRESSED_TAR_SUFFIXES):
+                archive = _StreamedTarWave(archive_path)
+            else:
+                archive = _TarWave(archive_path)
+            _archives[archive_path] = archive
+        return archive
+
+
+def scan_archive(archive_path):
+    """List an archive like a wave folder and return a WaveSnapshot."""
+    return get_archive(archive_path).snapshot()
+
+
+def open_source(wave_path, folder_name, file_name):
+    """Open one source .txt file in binary mode, from a folder tree or an archive."""
+    if is_archive(wave_path):
+        return get_archive(wave_path).open(folder_name, file_name)
+    return open(os.path.join(wave_path, folder_name, file_name), 'rb')
+
+
+def read_source(wave_path, folder_name, file_name):
+    """Return (raw bytes, size, mtime_ns) of one source .txt file."""
+    if is_archive(wave_path):
+        archive = get_archive(wave_path)
+        size, mtime_ns = archive.stat(folder_name, file_name)
+        with archive.open(folder_name, file_name) as f:
+            return f.read(), size, mtime_ns
+    with open(os.path.join(wave_path, folder_name, file_name), 'rb') as f:
+        st = os.fstat(f.fileno())
+        return f.read(), st.st_size, st.st_mtime_ns
+
+
+def stat_source(wave_path, folder_name, file_name):
+    """Return (size, mtime_ns) of one source .txt entry without reading it."""
+    if is_archive(wave_path):
+        return get_archive(wave_path).stat(folder_name, file_name)
+    st = os.stat(os.path.join(wave_path, folder_name, file_name))
+    return st.st_size, st.st_mtime_ns
+
+
+def source_digest(wave_path, folder_name, file_name, chunk_size=1 << 20):
+    """SHA-256 hex digest of one source .txt file, read in chunks."""
+    digest = hashlib.sha256()
+    with open_source(wave_path, folder_name, file_name) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,156 @@
+"""
+Change detection for a wave folder, for the watch mode.
+
+A watcher reports which university folders changed. Two implementations:
+
+- InotifyWatcher (Linux): the kernel reports file events for the wave folder
+  and every university folder, so a change is noticed right away and nothing
+  else in the tree is touched. Uses libc through ctypes, no extra packages.
+- PollingWatcher (everywhere else): re-scans the tree every poll_interval seconds
+  with wave_scanner and compares sizes and mtimes. While a burst is being
+  collected (a timeout shorter than the interval), it re-scans after the timeout,
+  so an empty result means two consecutive scans agreed.
+
+watcher.changes(timeout) waits up to timeout seconds (None = until something
+happens) and returns the set of changed university codes, or ALL_FOLDERS when
+the watcher lost track (e.g. the kernel event queue overflowed) and the whole
+tree must be checked.
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+
+import wave_scanner
+
+ALL_FOLDERS = None  # Returned by changes() when every folder must be checked
+
+# inotify event bits (see inotify(7))
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class InotifyWatcher:
+    """Reports changed university folders from Linux inotify events."""
+
+    def __init__(self, wave_path):
+        self.wave_path = os.path.abspath(wave_path)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.codes = {}  # Watch descriptor -> university code ("" for the wave folder itself)
+        try:
+            self._add_watch(self.wave_path, "")
+            with os.scandir(self.wave_path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        self._add_watch(entry.path, entry.name)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add_watch(self, path, code):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path} "
+                                              "(raise fs.inotify.max_user_watches, or use polling)")
+        self.codes[wd] = code
+
+    def changes(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    return ALL_FOLDERS
+                if mask & IN_IGNORED:
+                    self.codes.pop(wd, None)
+                    continue
+                code = self.codes.get(wd)
+                if code is None:
+                    continue
+                if code == "":
+                    # An event in the wave folder itself: a university folder came or went
+                    if mask & IN_ISDIR:
+                        changed.add(name)
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            try:
+                                self._add_watch(os.path.join(self.wave_path, name), name)
+                            except OSError:
+                                pass  # Already gone again; the update will see that
+                        elif mask & IN_MOVED_FROM:
+                            # The folder lives on elsewhere; stop attributing its events to this code
+                            for old_wd in [w for w, c in self.codes.items() if c == name]:
+                                self.libc.inotify_rm_watch(self.fd, old_wd)
+                                del self.codes[old_wd]
+                    elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        return ALL_FOLDERS
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF) or name.endswith(".txt"):
+                    changed.add(code)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Reports changed university folders by re-scanning the tree every poll_interval seconds."""
+
+    def __init__(self, wave_path, poll_interval=5.0):
+        self.wave_path = os.path.abspath(wave_path)
+        self.poll_interval = poll_interval
+        self.last = wave_scanner.scan_wave(self.wave_path).stat_map()
+        self.next_poll = time.monotonic() + poll_interval
+
+    def changes(self, timeout=None):
+        wait = self.next_poll - time.monotonic()
+        if timeout is not None and timeout < wait:
+            wait = timeout  # Collecting a burst: scan again after the quiet period, not only at the next poll
+        time.sleep(max(0.0, wait))
+        self.next_poll = time.monotonic() + self.poll_interval
+
+        current = wave_scanner.scan_wave(self.wave_path).stat_map()
+        changed = {code for code in set(current) | set(self.last) if current.get(code) != self.last.get(code)}
+        self.last = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(wave_path, poll_interval=5.0, use_inotify=True):
+    """Return an InotifyWatcher on Linux when possible, otherwise a PollingWatcher."""
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(wave_path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify not available ({e}), falling back to polling every {poll_interval}s")
+    return PollingWatcher(wave_path, poll_interval)
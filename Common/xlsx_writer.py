@@ -0,0 +1,262 @@
+"""
+Streaming .xlsx writer (standard library only).
+
+A workbook is a zip of XML files. The worksheet is written into the zip row by
+row while the rows are produced, so only the current row is in memory, however
+large the wave is:
+
+    writer = XlsxWriter("output_wave3.xlsx", fieldnames)
+    writer.writerow({"W4.Num": 1, "Code": "adelphi", "UniversityLink1": "...", ...})
+    writer.close()
+
+Strings go to the shared-strings table, so a page text that appears in several
+cells is stored once. The table itself is appended to a temporary file next to
+the workbook as new strings come in. Only a 16-byte digest per distinct string is
+kept in memory, and at most shared_strings_limit of them; later new strings are
+written inline in their cell. The table is copied into the zip when the writer
+is closed.
+
+The sheet opens ready to read. The header row is bold and frozen, the columns
+have fixed widths, and every row has the default height. Long pages wrap inside
+their cell instead of stretching the row. Excel cells hold at most 32,767
+characters, so longer texts are cut there: the cell ends with a "[cut here: ...]"
+marker, and truncation_warnings() lists every cut cell. To keep long pages
+complete, set main.py's spill_threshold to CELL_LIMIT or less so their cells
+hold store references.
+
+To convert an existing output (CSV, compressed CSV, .db or shard manifest):
+
+    python Common/xlsx_writer.py output_wave3_content_ordered.csv output_wave3.xlsx
+"""
+
+import os
+import re
+import shutil
+import hashlib
+import zipfile
+import argparse
+import tempfile
+from xml.sax.saxutils import escape, quoteattr
+
+import output_source
+
+CELL_LIMIT = 32767              # Characters an Excel cell can hold
+SHARED_STRINGS_LIMIT = 200_000  # Distinct strings in the shared-strings table (~130 bytes of memory each)
+ROW_HEIGHT = 15                 # Points; the default Excel row height
+LINK_COLUMN_WIDTH = 60          # Characters
+ZIP_LEVEL = 1                   # Deflate level; 1 writes about 4x faster than 6 for a ~30% larger file
+COLUMN_WIDTHS = {"W4.Num": 8, "Code": 14}
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_HEADER_STYLE = ' s="1"'
+_TEXT_STYLE = ' s="2"'
+
+# Characters XML 1.0 cannot hold (and "\r", which XML readers turn into "\n") are written as _xHHHH_;
+# a literal "_xHHHH_" in the text is protected by escaping its underscore
+_UNSAFE = re.compile("[\x00-\x08\x0b-\x1f\ufffe\uffff]")
+_ESCAPE_LIKE = re.compile(r"_(x[0-9A-Fa-f]{4}_)")
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+</Types>"""
+
+_ROOT_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="{_REL_NS}/styles" Target="styles.xml"/>
+<Relationship Id="rId3" Type="{_REL_NS}/sharedStrings" Target="sharedStrings.xml"/>
+</Relationships>"""
+
+# Style 0: default, 1: bold header, 2: page text (top-aligned, wrapped)
+_STYLES = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="{_MAIN_NS}">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0" applyAlignment="1"><alignment vertical="top" wrapText="1"/></xf>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+
+def column_letter(index):
+    """Spreadsheet column name of a 0-based column index (0 -> A, 26 -> AA)."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xml_text(text):
+    """Escape a string for an XML text node."""
+    if "_x" in text:
+        text = _ESCAPE_LIKE.sub(r"_x005F_\1", text)
+    if _UNSAFE.search(text):
+        text = _UNSAFE.sub(lambda m: f"_x{ord(m.group()):04X}_", text)
+    return escape(text)
+
+
+class XlsxWriter:
+    """
+    Writes one worksheet of dict rows (like csv.DictWriter) into an .xlsx file.
+    The workbook is built under "<path>.tmp" and moved into place by close().
+    """
+
+    def __init__(self, path, fieldnames, sheet_name="Wave", shared_strings_limit=SHARED_STRINGS_LIMIT):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.sheet_name = sheet_name
+        self.shared_strings_limit = shared_strings_limit
+        self.columns = [column_letter(i) for i in range(len(self.fieldnames))]
+        self.shared = {}         # Digest of a string -> its index in the shared-strings table
+        self.shared_cells = 0    # Cells that point into the shared-strings table
+        self.inline_cells = 0    # Cells written inline once the table was full
+        self.truncated = []      # "Code/column (characters)" of every text cut at CELL_LIMIT
+        self.rows = 0            # Rows written, header included
+
+        self.tmp_path = path + ".tmp"
+        self.zip = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL)
+        self.strings = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+        self.sheet = self.zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+
+        cols = "".join(f'<col min="{i}" max="{i}" width="{COLUMN_WIDTHS.get(name, LINK_COLUMN_WIDTH)}" customWidth="1"/>'
+                       for i, name in enumerate(self.fieldnames, start=1))
+        self.sheet.write(
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            f'<sheetViews><sheetView workbookViewId="0">'
+            f'<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+            f'<sheetFormatPr defaultRowHeight="{ROW_HEIGHT}" customHeight="1"/>'
+            f'<cols>{cols}</cols><sheetData>'.encode('utf-8'))
+        self._write_cells({name: name for name in self.fieldnames}, _HEADER_STYLE)
+
+    def _cut(self, text, where):
+        """Cut a text to CELL_LIMIT characters, ending it with a visible marker, and remember where."""
+        mark = f" [cut here: {len(text)} characters, Excel cells hold {CELL_LIMIT}]"
+        self.truncated.append(f"{where} ({len(text)} characters)")
+        return text[:CELL_LIMIT - len(mark)] + mark
+
+    def _string_cell(self, ref, text, style):
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        index = self.shared.get(key)
+        if index is None and len(self.shared) < self.shared_strings_limit:
+            # A new string: append it to the table on disk and keep only its digest
+            index = self.shared[key] = len(self.shared)
+            self.strings.write(f'<si><t xml:space="preserve">{_xml_text(text)}</t></si>'.encode('utf-8'))
+        if index is not None:
+            self.shared_cells += 1
+            return f'<c r="{ref}" t="s"{style}><v>{index}</v></c>'
+        self.inline_cells += 1
+        return f'<c r="{ref}" t="inlineStr"{style}><is><t xml:space="preserve">{_xml_text(text)}</t></is></c>'
+
+    def _write_cells(self, row, text_style):
+        self.rows += 1
+        r = self.rows
+        cells = []
+        for column, name in zip(self.columns, self.fieldnames):
+            value = row.get(name)
+            if value is None or value == "":
+                continue  # Empty cells are left out
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{column}{r}"><v>{value}</v></c>')
+            else:
+                text = str(value)
+                if len(text) > CELL_LIMIT:
+                    text = self._cut(text, f"{row.get('Code') or f'{column}{r}'}/{name}")
+                cells.append(self._string_cell(f"{column}{r}", text, text_style))
+        self.sheet.write(f'<row r="{r}">{"".join(cells)}</row>'.encode('utf-8'))
+
+    def writerow(self, row):
+        """Append one row. Numbers are written as numbers, everything else as text."""
+        self._write_cells(row, _TEXT_STYLE)
+
+    def close(self):
+        """Finish the workbook, move it into place and return its path."""
+        self.sheet.write(b"</sheetData></worksheet>")
+        self.sheet.close()
+
+        # Copy the shared-strings table from its temporary file into the zip
+        self.strings.seek(0)
+        with self.zip.open("xl/sharedStrings.xml", "w", force_zip64=True) as part:
+            part.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                       f'<sst xmlns="{_MAIN_NS}" count="{self.shared_cells}" '
+                       f'uniqueCount="{len(self.shared)}">'.encode('utf-8'))
+            shutil.copyfileobj(self.strings, part, 1 << 20)
+            part.write(b"</sst>")
+        self.strings.close()
+
+        self.zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self.zip.writestr("_rels/.rels", _ROOT_RELS)
+        self.zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        self.zip.writestr("xl/styles.xml", _STYLES)
+        self.zip.writestr("xl/workbook.xml",
+                          f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+                          f'<sheet name={quoteattr(self.sheet_name)} sheetId="1" r:id="rId1"/>'
+                          f'</sheets></workbook>')
+        self.zip.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def summary(self):
+        """One-line statistics for the run summary."""
+        line = (f"XLSX: {self.rows - 1} rows, {len(self.shared)} distinct strings shared by "
+                f"{self.shared_cells} cells, {self.inline_cells} inline")
+        if self.truncated:
+            line += f", {len(self.truncated)} texts cut at {CELL_LIMIT} characters"
+        return line
+
+    def truncation_warnings(self):
+        """One line per cut cell, then how to keep those pages whole (empty if nothing was cut)."""
+        if not self.truncated:
+            return []
+        return [f"Cut in the XLSX: {where}" for where in self.truncated] + [
+            f"Set spill_threshold in main.py to {CELL_LIMIT} or less to keep these pages whole in the content store"]
+
+
+def output_to_xlsx(output_path, xlsx_path, fieldnames=None):
+    """Write an existing output (CSV, compressed CSV, .db or shard manifest) as an .xlsx file. Returns the writer."""
+    writer = None
+    for row in output_source.iter_output_rows(output_path):
+        if writer is None:
+            writer = XlsxWriter(xlsx_path, fieldnames or list(row))
+        if str(row.get("W4.Num", "")).isdigit():
+            row = {**row, "W4.Num": int(row["W4.Num"])}
+        writer.writerow(row)
+    if writer is None:
+        if fieldnames is None:
+            raise ValueError(f"{output_path} has no rows; pass the fieldnames")
+        writer = XlsxWriter(xlsx_path, fieldnames)
+    writer.close()
+    return writer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert an output CSV (or .db / shard manifest) to .xlsx.")
+    parser.add_argument("output", help="Output CSV, compressed CSV, .db or .shards.json")
+    parser.add_argument("xlsx", help="Workbook to write")
+    args = parser.parse_args()
+
+    writer = output_to_xlsx(args.output, args.xlsx)
+    print(writer.summary())
+    for warning in writer.truncation_warnings():
+        print(f"⚠️ {warning}")
+    print(f"Workbook saved to: {args.xlsx}")
@@ -0,0 +1,129 @@
+"""
+Batch runner for several waves, with a per-university diff between consecutive waves.
+
+Every wave root uses the same folder-per-code layout as main.py (a folder, or a
+.zip/.tar.gz archive of one). All waves are read by one shared pool of worker
+threads, and each one gets its own output CSV plus manifest in output_dir:
+
+    output_wave3_content_ordered.csv (+ .manifest.json)
+    output_wave4_content_ordered.csv (+ .manifest.json)
+    wave_diff_wave3_vs_wave4.csv
+
+The manifest holds the SHA-256 of every page, so the diff (added, removed,
+changed or reordered pages per university, see Common/wave_diff.py) is computed
+from digests only. A wave whose manifest is still valid is not read again; only
+the folders that changed since its last run are re-read and patched in.
+
+Waves can be set in the waves dict below or given on the command line:
+    python batch_waves.py Wave3=/path/to/2021UniversityFiles Wave4=/path/to/2022UniversityFiles
+"""
+
+import os
+import sys
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main  # Shares its folder reader, CSV layout and helper imports
+
+import wave_manifest
+import wave_scanner
+import wave_diff
+import compressed_io
+
+# Wave name -> folder that contains the university subfolders, oldest first
+waves = {
+    "Wave3": "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles",
+    "Wave4": "/Users/helanwang/PycharmProjects/divHelan/Wave4/2022UniversityFiles",
+}
+
+# Folder for the per-wave CSVs and the diff CSVs
+output_dir = "/Users/helanwang/PycharmProjects/divHelan/outputCvs"
+
+# Number of worker threads shared by all waves
+max_workers = 8
+
+# Also list unchanged universities in the diff CSVs
+include_unchanged = False
+
+
+def output_csv_for(wave_name):
+    """Output CSV path of one wave, named like main.py's output_wave3_content_ordered.csv."""
+    return os.path.join(output_dir, f"output_{wave_name.lower()}_content_ordered.csv")
+
+
+def process_wave(wave_name, wave_path, executor, stats):
+    """
+    Bring one wave's CSV and manifest up to date and return the manifest's folder records.
+    Unchanged waves are not read at all; changed folders are re-read and patched in.
+    """
+    output_csv_path = output_csv_for(wave_name)
+    manifest_path = wave_manifest.manifest_path_for(output_csv_path)
+    manifest = wave_manifest.load_manifest(manifest_path, wave_path, output_csv_path)
+    snapshot = wave_scanner.get_snapshot(wave_path, refresh=True)
+
+    if manifest is not None:
+        added, removed, changed = wave_manifest.changed_folders(snapshot.stat_map(), manifest)
+        folders = manifest["folders"]
+        if not (added or removed or changed):
+            print(f"{wave_name}: no changes since the last run")
+            return folders
+
+        print(f"{wave_name}: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+        for code in removed:
+            del folders[code]
+        new_rows = {}
+        for row, _ in main.extract_rows(wave_path, max_workers, stats, sorted(added + changed), folders,
+                                        snapshot, executor=executor):
+            new_rows[row["Code"]] = row
+        row_numbers = {code: num for num, code in enumerate(snapshot.folder_names(), start=1)}
+        wave_manifest.patch_output_csv(output_csv_path, main.fieldnames, new_rows, set(removed), row_numbers)
+    else:
+        print(f"{wave_name}: reading {len(snapshot.folder_names())} universities")
+        folders = {}
+        with compressed_io.open_csv(output_csv_path, "w") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=main.fieldnames)
+            writer.writeheader()
+            for row, _ in main.extract_rows(wave_path, max_workers, stats, manifest_folders=folders,
+                                            snapshot=snapshot, executor=executor):
+                writer.writerow(row)
+
+    wave_manifest.save_manifest(manifest_path, wave_path, output_csv_path, folders)
+    print(f"{wave_name}: CSV saved to {output_csv_path}")
+    return folders
+
+
+def run_batch(waves):
+    """Process every wave with one shared thread pool, then diff each wave against the one before."""
+    start_time = time.perf_counter()
+    stats = {"files": 0, "bytes": 0}
+    os.makedirs(output_dir, exist_ok=True)
+
+    wave_folders = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for wave_name, wave_path in waves.items():
+            if not os.path.exists(wave_path):
+                raise FileNotFoundError(f"Directory not found: {wave_path}")
+            wave_folders[wave_name] = process_wave(wave_name, wave_path, executor, stats)
+
+    names = list(waves)
+    for old_name, new_name in zip(names, names[1:]):
+        diff_csv_path = os.path.join(output_dir, f"wave_diff_{old_name.lower()}_vs_{new_name.lower()}.csv")
+        diffs = wave_diff.diff_waves(wave_folders[old_name], wave_folders[new_name])
+        counts = wave_diff.write_diff_csv(diff_csv_path, diffs, include_unchanged)
+        summary = ", ".join(f"{counts.get(status, 0)} {status}"
+                            for status in ("added", "removed", "changed", "reordered", "unchanged"))
+        print(f"{old_name} -> {new_name}: {summary}")
+        print(f"Diff saved to: {diff_csv_path}")
+
+    print(f"Read {stats['files']} files ({stats['bytes']} bytes) in {time.perf_counter() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    # Waves given as name=path arguments replace the waves dict above
+    if len(sys.argv) > 1:
+        waves = {}
+        for arg in sys.argv[1:]:
+            name, _, path = arg.rpartition("=")
+            waves[name or os.path.basename(os.path.normpath(path))] = path
+    run_batch(waves)
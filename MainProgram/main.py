@@ -6,64 +6,503 @@ Description:
 This script processes a folder of university directories, each containing text files
 (e.g., 1.txt, 2.txt), and compiles their content into a structured CSV file.
 The CSV rows represent universities, and each column contains content from the respective text file.
+
+University folders are read concurrently by a pool of worker threads (the work is
+I/O bound, so threads are enough), but rows are still emitted in alphabetical
+folder order so the W4.Num numbering is the same as a serial run.
+Each row is written to the CSV as soon as it is built, so memory use stays at a
+few rows no matter how large the wave is.
+
+With incremental = True, a sidecar manifest (size, mtime and SHA-256 of every
+source file) is kept next to the CSV. Later runs only stat the tree, re-read the
+university folders that were added or changed, and patch those rows into the
+existing CSV; an unchanged wave is not read at all.
+
+With sqlite_output_path set, the same data is also written to a SQLite database
+with a full-text index on the content (see Common/sqlite_output.py).
+
+With term_index_path set, an inverted index of the page texts is built in the
+same pass (and patched by incremental runs), so term, phrase and boolean queries
+are answered without parsing the CSV (see Common/term_index.py).
+
+With shard_max_bytes and/or shard_max_rows set, the CSV is split into shards of
+alphabetically contiguous codes that stay under that budget, plus a
+"<output>.shards.json" manifest (see Common/sharded_output.py).
+
+wave3_path can also be a .zip or .tar(.gz) archive of the wave; it is read
+without unpacking it (see Common/wave_source.py).
+
+With content_store_path set, each distinct page text is saved once in a
+content-addressed store and the CSV cells hold "sha256:..." references
+(see Common/content_store.py). With spill_threshold set, only pages longer than
+the threshold go to the store (a "sha256:...:<length>" reference) and the rest
+stay in the CSV, so the CSV stays small and every cell fits in Google Sheets.
+
+With xlsx_output_path set, the rows are also streamed into an .xlsx workbook
+that opens with readable column widths and row heights (see Common/xlsx_writer.py).
+
+With strip_boilerplate = True, lines that a university's pages repeat (menus,
+headers, footers) and, with boilerplate_wave_share, lines found across much of
+the wave are dropped and whitespace is collapsed before the rows are written;
+the bytes removed per university go to "<output>.boilerplate.csv"
+(see Common/boilerplate.py).
+
+With profile_run = True, stage timings, per-university bytes and time, the
+slowest files and peak memory are written to "<output>.profile.json"
+(see Common/run_profile.py); profile_cprofile = True also records the run
+with cProfile.
 """
 
 import os
+import sys
 import csv
+import time
+import hashlib
+import contextlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-# Set the path to the main folder that contains university subfolders
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Common"))
+import wave_manifest
+import wave_scanner
+import sqlite_output
+import sharded_output
+import run_profile
+import content_store
+import wave_source
+import compressed_io
+import term_index
+import boilerplate
+import xlsx_writer
+
+# Set the path to the main folder that contains university subfolders (or a .zip/.tar.gz of it)
 wave3_path = "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles"
 
-# Initialize an empty list to store all rows for the CSV
-output_data = []
+# Set the path for the output CSV file (end it in .gz, .bz2 or .xz to compress it while writing)
+output_csv_path = "/Users/helanwang/PycharmProjects/divHelan/outputCvs/output_wave3_content_ordered.csv"
+
+# Number of worker threads used to read university folders (1 = read serially)
+max_workers = 8
+
+# Only re-read folders that changed since the last run (uses "<output>.manifest.json")
+incremental = False
+
+# Also write the rows into this SQLite database with full-text search (None = CSV only)
+sqlite_output_path = None  # e.g. "/Users/helanwang/PycharmProjects/divHelan/outputCvs/output_wave3.db"
 
-# Get all university folder names and sort them alphabetically
-# Each folder represents a university (e.g., "adelphi", "albany")
-folder_names = sorted([f for f in os.listdir(wave3_path) if os.path.isdir(os.path.join(wave3_path, f))])
+# Also keep an inverted index of the page texts in this folder for fast queries (None = no index)
+term_index_path = None  # e.g. "/Users/helanwang/PycharmProjects/divHelan/outputCvs/output_wave3_terms"
 
-# Iterate through each university folder
-for folder_name in folder_names:
-    folder_path = os.path.join(wave3_path, folder_name)
+# Also write the rows into this .xlsx workbook, ready to open or upload to Google Sheets (None = no workbook)
+xlsx_output_path = None  # e.g. "/Users/helanwang/PycharmProjects/divHelan/outputCvs/output_wave3.xlsx"
 
-    # Get all .txt files inside the folder and sort them by filename
-    # Files are expected to be named like 1.txt, 2.txt, etc.
-    txt_files = sorted([f for f in os.listdir(folder_path) if f.endswith(".txt")])  # Also sort files
+# Split the CSV into shards of at most this many bytes and/or rows (None = one CSV file)
+shard_max_bytes = None  # e.g. 50 * 1024 * 1024
+shard_max_rows = None   # e.g. 100
 
-    # Create a dictionary for the current university row
-    # "W4.Num" is a sequential number; "Code" is the folder name
-    row = {"W4.Num": len(output_data) + 1, "Code": folder_name}
+# Keep each distinct page text once in this folder and write "sha256:..." references to the CSV
+# (None = full texts in the CSV). Switching this on or off needs one full, non-incremental run.
+content_store_path = None  # e.g. "/Users/helanwang/PycharmProjects/divHelan/outputCvs/content_store"
 
-    # Read each .txt file and store its content under a key like "UniversityLink1", "UniversityLink2", etc.
-    for i, txt_file in enumerate(txt_files, start=1):
+# Only move pages longer than this many characters to the store (None = every page when
+# content_store_path is set). The store is content_store_path, or "content_store" next to the CSV.
+# Changing it needs one full, non-incremental run, like content_store_path.
+spill_threshold = None  # e.g. content_store.CELL_CHARACTER_LIMIT (the Google Sheets cell limit)
+
+# Drop the navigation/header/footer lines a university's pages repeat and collapse whitespace
+# (report in "<output>.boilerplate.csv"). Changing these needs one full, non-incremental run.
+strip_boilerplate = False
+boilerplate_university_share = 0.5  # A line in at least this share of a university's pages (and 2) is dropped
+boilerplate_wave_share = None       # e.g. 0.05: also drop lines found in 5% of all universities (one extra pass)
+
+# Write a timing/memory report to "<output>.profile.json" (and optionally a cProfile dump)
+profile_run = False
+profile_cprofile = False  # Also run under cProfile (only sees the main thread; use max_workers = 1)
+profile_top_files = 20    # Number of slowest files listed in the report
+
+# Define the CSV column headers: W4.Num, Code, and up to 6 UniversityLink columns
+fieldnames = ["W4.Num", "Code"] + [f"UniversityLink{i}" for i in range(1, 7)]  # Adjust columns as needed
+
+
+def read_university_folder(wave_path, folder_name, txt_files, profile=run_profile.NULL_PROFILE, store=None,
+                           stripper=None):
+    """
+    Read the given .txt files of one university folder (already in sorted filename order).
+    Returns (txt_files, contents, errors, bytes_read, records) where contents holds
+    one entry per file in txt_files (unreadable files get the "ERROR_READING_FILE"
+    placeholder) and records maps each file name to its size, mtime and SHA-256
+    for the manifest (None for unreadable files). Per-file reading/hashing/decoding/stripping times go to profile.
+    With a boilerplate stripper, the repeated lines are removed from the texts first.
+    With a content store, contents holds store references instead of the (long) texts.
+    """
+    folder_path = os.path.join(wave_path, folder_name)
+
+    contents = []
+    errors = []      # Error messages are printed by the caller so the log stays in folder order
+    records = {}
+    bytes_read = 0
+    failed = set()   # Positions of the "ERROR_READING_FILE" placeholders
+    for txt_file in txt_files:
         file_path = os.path.join(folder_path, txt_file)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()  # Remove leading/trailing whitespace
-                row[f"UniversityLink{i}"] = content  # Store the content in the row
+            t0 = time.perf_counter()
+            raw, size, mtime_ns = wave_source.read_source(wave_path, folder_name, txt_file)
+            bytes_read += len(raw)  # Size on disk, for the throughput report
+            t1 = time.perf_counter()
+            records[txt_file] = {"size": size, "mtime_ns": mtime_ns, "sha256": hashlib.sha256(raw).hexdigest()}
+            t2 = time.perf_counter()
+            # Decode the same way as open(..., 'r', encoding='utf-8') and remove leading/trailing whitespace
+            text = wave_manifest.decode_text(raw)
+            t3 = time.perf_counter()
+            contents.append(text.strip())
+            if profile.enabled:
+                profile.record_file(folder_name, txt_file, len(raw), {
+                    "reading": t1 - t0, "hashing": t2 - t1,
+                    "decoding": t3 - t2, "stripping": time.perf_counter() - t3})
         except Exception as e:
-            # If the file can't be read (e.g., encoding issue), print the error and insert a placeholder
-            print(f"Error reading {file_path}: {e}")
-            row[f"UniversityLink{i}"] = "ERROR_READING_FILE"
+            # If the file can't be read (e.g., encoding issue), keep the error and insert a placeholder
+            errors.append(f"Error reading {file_path}: {e}")
+            failed.add(len(contents))
+            try:  # Recorded without a digest, so the folder is only re-read once the entry changes
+                size, mtime_ns = wave_source.stat_source(wave_path, folder_name, txt_file)
+                records[txt_file] = {"size": size, "mtime_ns": mtime_ns, "sha256": None}
+            except OSError:
+                pass  # Gone since the scan; the next run sees a different listing anyway
+            contents.append("ERROR_READING_FILE")
 
-    # Add the current university's data row to the full dataset
-    output_data.append(row)
+    if stripper:
+        t0 = time.perf_counter()
+        contents = stripper.strip(folder_name, [None if i in failed else c for i, c in enumerate(contents)])
+        for i in failed:
+            contents[i] = "ERROR_READING_FILE"
+        profile.add_time("stripping_boilerplate", time.perf_counter() - t0)
+    if store:
+        contents = [c if i in failed else store.cell(c) for i, c in enumerate(contents)]
 
-# Set the path for the output CSV file
-output_csv_path = "/Users/helanwang/PycharmProjects/divHelan/outputCvs/output_wave3_content_ordered.csv"
+    return txt_files, contents, errors, bytes_read, records
 
-# Define the CSV column headers: W4.Num, Code, and up to 6 UniversityLink columns
-fieldnames = ["W4.Num", "Code"] + [f"UniversityLink{i}" for i in range(1, 7)]  # Adjust columns as needed
 
-# Open the output file and write the data using csv.DictWriter
-with open(output_csv_path, mode="w", newline="", encoding="utf-8") as csv_file:
-    writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-    writer.writeheader()           # Write the column headers
-    writer.writerows(output_data) # Write each university row
+def extract_rows(wave_path, workers=max_workers, stats=None, folder_names=None, manifest_folders=None,
+                 snapshot=None, profile=run_profile.NULL_PROFILE, executor=None, store=None, stripper=None):
+    """
+    Yield (row dict, file names) for each university folder, in alphabetical order.
+    Folders are read by a thread pool, but only a small window of folders is in
+    flight at a time and results are consumed in submission order, so the rows
+    (and their W4.Num) come out exactly as in a serial run and only a few rows
+    are ever held in memory.
+    If a stats dict is given, its "files" and "bytes" totals are updated as rows are built.
+    folder_names restricts the run to those folders (rows are then numbered 1..n
+    among them), and manifest_folders, if given, receives each folder's file records.
+    The folder and file listing comes from a wave_scanner snapshot (a fresh scan
+    unless the caller passes one it just took). Listing, waiting and per-file
+    times are recorded in profile. An existing executor can be passed in to share
+    one pool of reader threads between several waves. With a content store, the
+    rows hold store references instead of page texts; with a boilerplate stripper,
+    the texts have their repeated lines removed.
+    """
+    if stats is not None:
+        stats.setdefault("files", 0)
+        stats.setdefault("bytes", 0)
+
+    # Walk the tree once: university folders and the .txt files inside them
+    if snapshot is None:
+        with profile.stage("listing"):
+            snapshot = wave_scanner.get_snapshot(wave_path, refresh=True)
+
+    # Get all university folder names and sort them alphabetically
+    # Each folder represents a university (e.g., "adelphi", "albany")
+    # Files are expected to be named like 1.txt, 2.txt, etc. and are read in sorted order
+    if folder_names is None:
+        folder_names = snapshot.folder_names()
+
+    workers = max(1, workers)
+    with contextlib.nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()  # (folder_name, future) pairs, oldest first
+        names = iter(folder_names)
+
+        # Keep at most two folders per worker queued so memory stays bounded
+        for folder_name in islice(names, workers * 2):
+            pending.append((folder_name, executor.submit(
+                read_university_folder, wave_path, folder_name, snapshot.txt_files(folder_name), profile, store,
+                stripper)))
+
+        row_number = 0
+        while pending:
+            folder_name, future = pending.popleft()
+            next_name = next(names, None)
+            if next_name is not None:
+                pending.append((next_name, executor.submit(
+                    read_university_folder, wave_path, next_name, snapshot.txt_files(next_name), profile, store,
+                    stripper)))
+
+            # Time the main thread spends blocked on the readers
+            with profile.stage("waiting_for_workers"):
+                txt_files, contents, errors, bytes_read, records = future.result()
+            if manifest_folders is not None:
+                manifest_folders[folder_name] = records
+            for error_msg in errors:
+                print(error_msg)
+
+            # "W4.Num" is a sequential number; "Code" is the folder name
+            row_number += 1
+            row = {"W4.Num": row_number, "Code": folder_name}
+            # Store each file's content under a key like "UniversityLink1", "UniversityLink2", etc.
+            for i, content in enumerate(contents, start=1):
+                row[f"UniversityLink{i}"] = content
+
+            if stats is not None:
+                stats["files"] += len(contents)
+                stats["bytes"] += bytes_read
+            yield row, txt_files
+
+
+def print_xlsx_summary(writer):
+    """Print the workbook statistics and every cell that had to be cut."""
+    print(writer.summary())
+    for warning in writer.truncation_warnings():
+        print(f"⚠️ {warning}")
+
+
+def saved_stripper():
+    """
+    The boilerplate stripper for patching an existing output: it strips with the wave-wide lines
+    counted by the last full run, so old and new rows match. None if those lines were not saved.
+    """
+    return boilerplate.saved_stripper(output_csv_path, boilerplate_university_share, boilerplate_wave_share)
+
+
+def run_incremental(stats, profile=run_profile.NULL_PROFILE, store=None, codes=None, write_xlsx=True):
+    """
+    Patch only the added, changed or removed universities into the existing CSV.
+    Returns the number of rows in the CSV, or None if a full rebuild is needed.
+    codes limits the check to those university folders (e.g. the ones a watcher
+    saw change), so the rest of the tree is not even stat'ed. The re-read and
+    removed codes are stored in stats["updated_codes"] and stats["removed_codes"].
+    With write_xlsx=False the XLSX workbook is left as it was (watch mode writes it when it stops).
+    """
+    manifest_path = wave_manifest.manifest_path_for(output_csv_path)
+    manifest = wave_manifest.load_manifest(manifest_path, wave3_path, output_csv_path)
+    if manifest is None:
+        print("No usable manifest found, doing a full rebuild.")
+        return None
+    if sqlite_output_path and not os.path.exists(sqlite_output_path):
+        print("SQLite output not found, doing a full rebuild.")
+        return None
+    if term_index_path and not term_index.index_exists(term_index_path):
+        print("Term index not found, doing a full rebuild.")
+        return None
+    stripper = saved_stripper() if strip_boilerplate else None
+    if strip_boilerplate and stripper is None:
+        print("Boilerplate lines not found, doing a full rebuild.")
+        return None
+
+    # Stat the tree only; nothing is read unless a folder changed
+    with profile.stage("listing"):
+        if codes is None:
+            snapshot = wave_scanner.get_snapshot(wave3_path, refresh=True)
+            known = manifest
+        else:
+            snapshot = wave_scanner.scan_folders(wave3_path, codes)
+            known = {"folders": {code: manifest["folders"][code] for code in codes if code in manifest["folders"]}}
+    added, removed, changed = wave_manifest.changed_folders(snapshot.stat_map(), known)
+    if codes is None:
+        all_codes = snapshot.folder_names()
+    else:
+        all_codes = sorted((set(manifest["folders"]) - set(removed)) | set(added))
+    stats["updated_codes"] = sorted(added + changed)
+    stats["removed_codes"] = removed
+    if not (added or removed or changed):
+        print("No changes since the last run; CSV left untouched.")
+        return len(all_codes)
+
+    print(f"Incremental update: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+    to_read = sorted(added + changed)
+    folders = manifest["folders"]
+    for code in removed:
+        del folders[code]
+
+    # Re-read only the affected folders; their W4.Num is fixed up while patching
+    db_writer = sqlite_output.SqliteRowWriter(sqlite_output_path, replace=False) if sqlite_output_path else None
+    term_writer = term_index.TermIndexWriter(term_index_path, replace=False) if term_index_path else None
+    new_rows = {}
+    for row, file_names in extract_rows(wave3_path, max_workers, stats, to_read, folders, snapshot, profile,
+                                        store=store, stripper=stripper):
+        new_rows[row["Code"]] = row
+        full_row = content_store.expand_row(row, store) if store else row
+        if db_writer:
+            with profile.stage("writing_sqlite"):
+                db_writer.write_row(full_row, file_names)
+        if term_writer:
+            with profile.stage("indexing_terms"):
+                term_writer.write_row(full_row)
+    row_numbers = {code: num for num, code in enumerate(all_codes, start=1)}
+    with profile.stage("writing_csv"):
+        wave_manifest.patch_output_csv(output_csv_path, fieldnames, new_rows, set(removed), row_numbers)
+    if db_writer:
+        with profile.stage("writing_sqlite"):
+            db_writer.remove_codes(removed)
+            db_writer.renumber(row_numbers)
+            db_writer.close()
+    if term_writer:
+        with profile.stage("indexing_terms"):
+            term_writer.remove_codes(removed)
+            term_writer.close()
+    if stripper:
+        boilerplate.write_report(boilerplate.report_path_for(output_csv_path), stripper.codes, removed, update=True)
+        print(stripper.summary())
+    if xlsx_output_path and write_xlsx:
+        # A workbook cannot be patched in place: stream it again from the patched CSV
+        with profile.stage("writing_xlsx"):
+            print_xlsx_summary(xlsx_writer.output_to_xlsx(output_csv_path, xlsx_output_path, fieldnames))
+    with profile.stage("manifest"):
+        wave_manifest.save_manifest(manifest_path, wave3_path, output_csv_path, folders)
+    return len(all_codes)
+
+
+def main():
+    start_time = time.perf_counter()
+    stats = {"files": 0, "bytes": 0}
+
+    # Instrumentation is a no-op unless profile_run is set
+    profile = (run_profile.RunProfile(profile_top_files, profile_cprofile) if profile_run
+               else run_profile.NULL_PROFILE)
+    profile.start()
+    try:
+        run(start_time, stats, profile)
+    finally:
+        if profile.enabled:
+            report_path = profile.write_report(run_profile.profile_path_for(output_csv_path))
+            print(f"Profile report saved to: {report_path}")
+
+
+def open_store():
+    """The content store the page texts go to, or None when the CSV holds every text."""
+    if spill_threshold is not None:
+        return content_store.ContentStore(content_store_path or content_store.default_store_dir(output_csv_path),
+                                          spill_threshold)
+    return content_store.ContentStore(content_store_path) if content_store_path else None
+
+
+def run(start_time, stats, profile):
+    """Build (or incrementally patch) the output and print the summary."""
+    store = open_store()
+    sharded = bool(shard_max_bytes or shard_max_rows)
+    if incremental and sharded:
+        print("Incremental updates are not supported for sharded output, doing a full rebuild.")
+    elif incremental:
+        row_count = run_incremental(stats, profile, store)
+        if row_count is not None:
+            print(f"CSV file saved to: {output_csv_path}")
+            if store:
+                print(store.summary())
+            print(f"Total number of universities (unique codes): {row_count}")
+            print(f"Re-read {stats['files']} files ({stats['bytes']} bytes) "
+                  f"in {time.perf_counter() - start_time:.2f}s")
+            return
+
+    # Count the lines repeated across the wave before any row is built
+    snapshot = None
+    stripper = None
+    if strip_boilerplate:
+        wave_blocks = frozenset()
+        if boilerplate_wave_share:
+            with profile.stage("listing"):
+                snapshot = wave_scanner.get_snapshot(wave3_path, refresh=True)
+            with profile.stage("counting_boilerplate"):
+                wave_blocks = boilerplate.count_wave_blocks(wave3_path, snapshot, boilerplate_wave_share)
+            boilerplate.save_blocks(boilerplate.blocks_path_for(output_csv_path), boilerplate_wave_share, wave_blocks)
+        stripper = boilerplate.Stripper(boilerplate_university_share, wave_blocks)
+
+    # Running counters for the summary, so rows never have to be kept after they are written
+    row_count = 0
+    unique_codes = set()
+    manifest_folders = {}
+
+    # The SQLite database (if enabled) is filled in the same pass, in batched transactions
+    db_writer = sqlite_output.SqliteRowWriter(sqlite_output_path) if sqlite_output_path else None
+    term_writer = term_index.TermIndexWriter(term_index_path) if term_index_path else None
+    xlsx_file = xlsx_writer.XlsxWriter(xlsx_output_path, fieldnames) if xlsx_output_path else None
+
+    # Open the output first and write each university row as soon as it is built
+    if sharded:
+        writer = sharded_output.ShardedCsvWriter(output_csv_path, fieldnames, shard_max_bytes, shard_max_rows)
+        csv_file = None
+    else:
+        csv_file = compressed_io.open_csv(output_csv_path, "w")
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()           # Write the column headers
+    try:
+        for row, file_names in extract_rows(wave3_path, max_workers, stats, manifest_folders=manifest_folders,
+                                            snapshot=snapshot, profile=profile, store=store, stripper=stripper):
+            with profile.stage("writing_csv"):
+                writer.writerow(row)   # Write this university row
+            if xlsx_file:
+                with profile.stage("writing_xlsx"):
+                    xlsx_file.writerow(row)
+            # The database and the term index always get the full texts
+            full_row = content_store.expand_row(row, store) if store else row
+            if db_writer:
+                with profile.stage("writing_sqlite"):
+                    db_writer.write_row(full_row, file_names)
+            if term_writer:
+                with profile.stage("indexing_terms"):
+                    term_writer.write_row(full_row)
+            row_count += 1
+            unique_codes.add(row["Code"])
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    if sharded:
+        with profile.stage("writing_csv"):
+            shard_manifest_path = writer.close()
+        print(f"{len(writer.shards)} shards described in: {shard_manifest_path}")
+    if db_writer:
+        with profile.stage("writing_sqlite"):
+            db_writer.close()
+        print(f"SQLite database saved to: {sqlite_output_path}")
+    if term_writer:
+        with profile.stage("indexing_terms"):
+            term_writer.close()
+        print(f"Term index saved to: {term_index_path}")
+    if xlsx_file:
+        with profile.stage("writing_xlsx"):
+            xlsx_file.close()
+        print_xlsx_summary(xlsx_file)
+        print(f"XLSX workbook saved to: {xlsx_output_path}")
+
+    elapsed = time.perf_counter() - start_time
+
+    # Record what went into the CSV so the next incremental run can skip unchanged folders
+    if incremental and not sharded:
+        with profile.stage("manifest"):
+            wave_manifest.save_manifest(wave_manifest.manifest_path_for(output_csv_path),
+                                        wave3_path, output_csv_path, manifest_folders)
+
+    # Notify the user that the file was created successfully
+    if not sharded:
+        print(f"CSV file saved to: {output_csv_path}")
+    print(f"Rows written: {row_count}")
+
+    # Print the total number of unique university codes processed
+    university_count = len(unique_codes)
+    print(f"Total number of universities (unique codes): {university_count}")
+    if store:
+        print(store.summary())
+    if stripper:
+        report_path = boilerplate.report_path_for(output_csv_path)
+        boilerplate.write_report(report_path, stripper.codes)
+        print(stripper.summary())
+        print(f"Boilerplate report saved to: {report_path}")
+
+    # Report read throughput so the worker count can be tuned for the file share
+    elapsed = max(elapsed, 1e-9)
+    print(f"Read {stats['files']} files ({stats['bytes']} bytes) in {elapsed:.2f}s "
+          f"with {max_workers} workers: {stats['files'] / elapsed:.1f} files/sec, "
+          f"{stats['bytes'] / elapsed:.0f} bytes/sec")
 
-# Notify the user that the file was created successfully
-print(f"CSV file saved to: {output_csv_path}")
 
-# Count and print the total number of unique university codes processed
-unique_codes = set(row['Code'] for row in output_data)
-university_count = len(unique_codes)
-print(f"Total number of universities (unique codes): {university_count}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
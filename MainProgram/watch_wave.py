@@ -0,0 +1,184 @@
+"""
+Watch mode: keep the output CSV up to date while new .txt files land in the wave.
+
+Uses the settings of main.py (wave3_path, output_csv_path, sqlite_output_path,
+content_store_path, max_workers). On start the CSV is brought up to date once
+(an incremental run, or a full build if there is no manifest yet). After that the
+script waits for changes under the wave folder (inotify on Linux, polling
+elsewhere, see Common/wave_watcher.py). A burst of changes is collected until
+nothing has happened for debounce_seconds, then only the affected universities
+are re-read and patched into the CSV, which is replaced atomically. The patched
+rows are then checked against their source files (after the same boilerplate
+stripping as main.py, when strip_boilerplate is on).
+
+Only the affected folders are stat'ed and read, so an update takes about the same
+time whatever the size of the wave (the CSV itself is still rewritten in one
+streamed pass). The XLSX workbook (xlsx_output_path) is not rewritten after every
+update unless update_xlsx is set; it is written once when watching stops.
+Stop with Ctrl+C.
+
+    python watch_wave.py
+"""
+
+import os
+import time
+import hashlib
+from datetime import datetime
+
+import main  # Shares its settings, folder reader and incremental update
+
+import wave_manifest
+import wave_scanner
+import wave_watcher
+import csv_index
+import content_store
+import wave_source
+import boilerplate
+import xlsx_writer
+
+# Wait until no new change has been seen for this many seconds before updating
+debounce_seconds = 2.0
+
+# Polling interval when inotify is not available (or use_inotify = False)
+poll_interval = 5.0
+use_inotify = True
+
+# Check each patched row against its source files after every update
+verify_updates = True
+
+# Rewrite main.py's xlsx_output_path after every update (the whole workbook is streamed again each time)
+update_xlsx = False
+
+
+def timestamp():
+    return datetime.now().strftime('%H:%M:%S')
+
+
+def verify_codes(codes):
+    """
+    Check the CSV rows of the given codes against their source files.
+    Returns a list of problem descriptions (empty when every row matches).
+    With strip_boilerplate, the files are stripped the way main.py wrote them.
+    """
+    rows = csv_index.read_rows(main.output_csv_path, codes)
+    snapshot = wave_scanner.scan_folders(main.wave3_path, codes)
+    max_links = len(main.fieldnames) - 2
+    problems = []
+    stripper = main.saved_stripper() if main.strip_boilerplate else None
+    if main.strip_boilerplate and stripper is None:
+        print(f"[{timestamp()}] Boilerplate lines of the last full run not found: "
+              "only link counts are checked, not the contents")
+    for code in codes:
+        row = rows.get(code)
+        if row is None:
+            problems.append(f"{code}: row not found in {main.output_csv_path}")
+            continue
+
+        txt_files = snapshot.txt_files(code)
+        texts = []  # What main.py writes for each file, None if it cannot be read
+        for txt_file in txt_files:  # All of them: main.py strips over the whole folder
+            try:
+                raw, _, _ = wave_source.read_source(main.wave3_path, code, txt_file)
+                texts.append(wave_manifest.decode_text(raw).strip())
+            except Exception:
+                texts.append(None)
+        if stripper:
+            texts = stripper.strip(code, texts)
+
+        for i in range(1, max_links + 1):
+            cell = row.get(f"UniversityLink{i}") or ""
+            if i > len(txt_files):
+                if cell:
+                    problems.append(f"{code}: UniversityLink{i} is set but there is no file for it")
+                continue
+            if main.strip_boilerplate and stripper is None:
+                continue  # Cannot rebuild the stripped text; the link count was checked above
+            expected = texts[i - 1] if texts[i - 1] is not None else "ERROR_READING_FILE"
+            if content_store.is_ref(cell):
+                matches = content_store.ref_digest(cell) == hashlib.sha256(expected.encode('utf-8')).hexdigest()
+            else:
+                matches = cell == expected
+            if not matches:
+                problems.append(f"{code}/{txt_files[i - 1]}: CSV content does not match the file")
+    return problems
+
+
+def full_update():
+    """Incremental run over the whole tree (or a full build when there is no usable manifest)."""
+    main.incremental = True
+    main.main()
+
+
+def update(codes):
+    """
+    Re-read the given university codes (or every folder for ALL_FOLDERS) and patch them into the CSV.
+    Returns True if the CSV changed but the XLSX workbook was left as it was.
+    """
+    start_time = time.perf_counter()
+    stats = {"files": 0, "bytes": 0}
+    store = main.open_store()
+
+    if codes is wave_watcher.ALL_FOLDERS:
+        print(f"[{timestamp()}] Lost track of individual changes, checking the whole tree")
+        row_count = main.run_incremental(stats, store=store, write_xlsx=update_xlsx)
+    else:
+        print(f"[{timestamp()}] Changes in: {', '.join(sorted(codes))}")
+        row_count = main.run_incremental(stats, store=store, codes=sorted(codes), write_xlsx=update_xlsx)
+    if row_count is None:
+        full_update()  # The manifest or CSV was replaced behind our back
+        return False
+
+    updated = stats.get("updated_codes", [])
+    removed = stats.get("removed_codes", [])
+    print(f"[{timestamp()}] Updated {len(updated)}, removed {len(removed)} universities "
+          f"({stats['files']} files read) in {time.perf_counter() - start_time:.2f}s")
+
+    if verify_updates and updated:
+        problems = verify_codes(updated)
+        if problems:
+            print(f"❌ {len(problems)} problems after the update:")
+            for problem in problems:
+                print(f"   {problem}")
+        else:
+            print(f"✅ Verified {len(updated)} updated rows")
+    return bool(updated or removed) and bool(main.xlsx_output_path) and not update_xlsx
+
+
+def watch():
+    """Bring the CSV up to date, then update it after every burst of changes until interrupted."""
+    if main.shard_max_bytes or main.shard_max_rows:
+        raise SystemExit("Watch mode needs a single output CSV; unset shard_max_bytes and shard_max_rows.")
+    if wave_source.is_archive(main.wave3_path):
+        raise SystemExit("Watch mode needs a wave folder, not an archive.")
+
+    full_update()
+    watcher = wave_watcher.make_watcher(main.wave3_path, poll_interval, use_inotify)
+    print(f"\n👀 Watching {main.wave3_path} (Ctrl+C to stop)")
+    if main.xlsx_output_path and not update_xlsx:
+        print(f"   {main.xlsx_output_path} is written again when watching stops (update_xlsx = False)")
+    pending = set()
+    xlsx_stale = False
+    try:
+        while True:
+            # Block until something happens, then keep collecting until things settle down
+            changed = watcher.changes(debounce_seconds if pending else None)
+            if changed is wave_watcher.ALL_FOLDERS:
+                xlsx_stale = update(wave_watcher.ALL_FOLDERS) or xlsx_stale
+                pending = set()
+            elif changed:
+                pending |= changed
+            elif pending:
+                xlsx_stale = update(pending) or xlsx_stale
+                pending = set()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+        if xlsx_stale:
+            print(f"Writing the XLSX workbook: {main.xlsx_output_path}")
+            main.print_xlsx_summary(
+                xlsx_writer.output_to_xlsx(main.output_csv_path, main.xlsx_output_path, main.fieldnames))
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    watch()
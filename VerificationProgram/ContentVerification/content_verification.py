@@ -1,167 +1,534 @@
-"""Find any mismatched txt file with university codes."""
+"""Find any mismatched txt file with university codes.
+
+Every folder is listed once and every file is read once during extraction, where
+SHA-256 digests of each CSV cell and each source file are captured. Rows are
+written as they are read. The verification phase then streams the written CSV
+back and compares each cell's digest, plus a fresh digest of each source file,
+against those captured digests, so no second copy of the texts is kept in memory.
+
+With incremental = True, a manifest of every source file (size, mtime, SHA-256)
+is saved next to the output CSV; later runs only stat the tree and re-extract and
+re-verify the university folders that were added, changed or removed.
+
+With profile_run = True, stage timings, per-university bytes and time, the
+slowest files and peak memory are written to "<csv>.profile.json"
+(see Common/run_profile.py).
+
+With content_store_path set, each distinct page text is saved once in a
+content-addressed store and the CSV holds "sha256:..." references
+(see Common/content_store.py). Identical texts are then verified only once.
+
+With sample_verification = True, nothing is extracted: an existing CSV is checked
+against a seeded random sample of the source files, stratified by file size so the
+few very large pages are represented too. The summary reports the estimated share
+of mismatching files with an upper confidence bound, and with escalate_to_full
+every file is checked as soon as the sample finds a problem. An output whose long
+pages were spilled to a store by main.py (spill_threshold) is checked the same way.
+For an output written with main.py's strip_boilerplate, set the same strip_boilerplate
+settings here: each file is then compared with its text after the same stripping.
+"""
 
 import os
+import sys
 import csv
+import time
+import math
+import random
+import hashlib
 from datetime import datetime
+from statistics import NormalDist
+
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+import wave_manifest
+import wave_scanner
+import run_profile
+import content_store
+import wave_source
+import compressed_io
+import output_source
+import boilerplate
 
 # ===== Configuration =====
-wave3_path = "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles"  # Path to university folders
-output_csv_name = "university_links.csv"  # Name of output CSV file
+wave3_path = "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles"  # University folders, or a .zip/.tar.gz of them
+output_csv_name = "university_links.csv"  # Name of output CSV file (add .gz, .bz2 or .xz to compress it)
 strict_validation = True  # Enable strict content verification
 overwrite_existing = True  # Allow overwriting existing CSV file if it exists
+incremental = False  # Only re-read folders that changed since the last run (uses "<csv>.manifest.json")
+profile_run = False  # Write a timing/memory report to "<csv>.profile.json"
+profile_cprofile = False  # Also record the run with cProfile ("<csv>.profile.pstats")
+content_store_path = None  # Keep each distinct page text once in this folder (None = full texts in the CSV)
 
-# ===== Initialize =====
-output_data = []     # Will hold each university's data row
-mismatches = []      # Will collect read errors or verification mismatches
-
-# Validate that the input directory exists
-if not os.path.exists(wave3_path):
-    raise FileNotFoundError(f"Directory not found: {wave3_path}")
-
-# Check if output file exists and prevent overwrite if not allowed
-if os.path.exists(output_csv_name) and not overwrite_existing:
-    raise FileExistsError(
-        f"Output file {output_csv_name} already exists. "
-        "Set overwrite_existing=True to overwrite or change output_csv_name."
-    )
-
-# ===== Process Folders =====
-# Get a sorted list of all university folders
-folder_names = sorted([f for f in os.listdir(wave3_path) if os.path.isdir(os.path.join(wave3_path, f))])
-
-# Find the max number of .txt files any folder contains (used for dynamic column generation)
-max_links = max(
-    len([f for f in os.listdir(os.path.join(wave3_path, folder))
-         if f.endswith('.txt') and os.path.isfile(os.path.join(wave3_path, folder, f))])
-    for folder in folder_names
-)
-
-# Loop through each folder and read the text files
-for idx, folder_name in enumerate(folder_names, 1):
-    folder_path = os.path.join(wave3_path, folder_name)
-
-    # Get sorted list of all .txt files in this university folder
-    txt_files = sorted(
-        [f for f in os.listdir(folder_path) if f.endswith(".txt") and os.path.isfile(os.path.join(folder_path, f))]
-    )
-
-    # Warn if the folder has no .txt files
-    if not txt_files:
-        print(f"⚠️ No text files in {folder_name}")
-        continue
-
-    # Initialize row data with ID number and folder name
-    row = {"W4.Num": idx, "Code": folder_name}
-
-    # Read content of each .txt file and store in row
-    for i, txt_file in enumerate(txt_files, 1):
-        file_path = os.path.join(folder_path, txt_file)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()  # Read file and strip whitespace
-                row[f"UniversityLink{i}"] = content  # Add to CSV row
-        except Exception as e:
-            # If reading fails, record the error and insert placeholder
-            error_msg = f"Error reading {file_path}: {str(e)}"
-            print(error_msg)
-            row[f"UniversityLink{i}"] = "ERROR_READING_FILE"
-            mismatches.append({
-                "Folder": folder_name,
-                "File": txt_file,
-                "Error": error_msg,
-                "Type": "Read Error"
-            })
-
-    output_data.append(row)  # Save completed row
-
-# ===== Write Main CSV =====
-# Generate column headers: W4.Num, Code, UniversityLink1 ~ UniversityLinkN
-fieldnames = ["W4.Num", "Code"] + [f"UniversityLink{i}" for i in range(1, max_links + 1)]
-
-# Write the full CSV file
-with open(output_csv_name, mode="w", newline="", encoding="utf-8") as csv_file:
-    writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-    writer.writeheader()           # Write header row
-    writer.writerows(output_data)  # Write all university rows
-
-# Confirm success
-print(f"\n✅ Data saved to: {output_csv_name}")
-print(f"Total universities processed: {len(output_data)}")
-
-# ===== Strict Verification Phase =====
-print("\n🔍 Starting STRICT verification...")
-
-# Go back and verify if CSV content matches original .txt file content
-for row in output_data:
-    folder_name = row["Code"]
-    folder_path = os.path.join(wave3_path, folder_name)
-
-    # Get list of .txt files for this university
-    txt_files = sorted(
-        [f for f in os.listdir(folder_path) if f.endswith(".txt") and os.path.isfile(os.path.join(folder_path, f))]
-    )
-
-    for i, txt_file in enumerate(txt_files, 1):
-        file_path = os.path.join(folder_path, txt_file)
-        csv_value = row.get(f"UniversityLink{i}", "")  # Get value from CSV
+# Sampling mode: check a random sample of the files behind an existing CSV (e.g. main.py's output)
+# instead of extracting and checking everything
+sample_verification = False
+sample_size = 400          # About this many .txt files are checked
+sample_seed = 2021         # The same seed (and wave) always gives the same sample
+sample_strata = 4          # Size classes (equal numbers of files, smallest to largest) sampled proportionally
+sample_confidence = 0.95   # Confidence level of the reported upper bound on the mismatch rate
+escalate_to_full = True    # Check every file when the sample finds any problem
 
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                file_content = f.read().strip()  # Read actual file content again
+# Boilerplate stripping main.py used for the checked output (sampling mode only; use main.py's values)
+strip_boilerplate = False
+boilerplate_university_share = 0.5
+boilerplate_wave_share = None
+
+
+def text_digest(text):
+    """SHA-256 of a CSV cell value, so whole texts never need to be kept for comparison."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def read_text(wave3_path, folder_name, txt_file):
+    """Read a .txt file the same way the extraction phase does (used only to report a mismatch)."""
+    raw, _, _ = wave_source.read_source(wave3_path, folder_name, txt_file)
+    return wave_manifest.decode_text(raw).strip()
+
+
+def verify_content(wave3_path, output_csv_name, profile=run_profile.NULL_PROFILE, store_dir=None):
+    """
+    Extract every university folder into output_csv_name and verify the result.
+    Returns a summary dict with the final stats. Stage and per-file timings go to profile.
+    With store_dir, the page texts go to a content store and the CSV holds references.
+    """
+    # ===== Initialize =====
+    row_digests = {}     # Code -> [(cell digest, file digest or None), ...] captured at extraction time
+    changed_rows = {}    # Re-read rows, kept only in incremental mode to patch the existing CSV
+    mismatches = []      # Will collect read errors or verification mismatches
+    manifest_folders = {}  # File records (size, mtime, digest) for the manifest
+    store = content_store.ContentStore(store_dir) if store_dir else None
+
+    # Validate that the input directory exists
+    if not os.path.exists(wave3_path):
+        raise FileNotFoundError(f"Directory not found: {wave3_path}")
+
+    # Check if output file exists and prevent overwrite if not allowed
+    if os.path.exists(output_csv_name) and not overwrite_existing and not incremental:
+        raise FileExistsError(
+            f"Output file {output_csv_name} already exists. "
+            "Set overwrite_existing=True to overwrite or change output_csv_name."
+        )
+
+    # ===== Process Folders =====
+    # Walk the tree once (fresh, since this run extracts content); the listing is reused
+    # for extraction, verification and change detection
+    with profile.stage("listing"):
+        snapshot = wave_scanner.get_snapshot(wave3_path, refresh=True)
+
+    # Get a sorted list of all university folders
+    folder_names = snapshot.folder_names()
+
+    # Sorted .txt files (regular files only) of every folder
+    folder_files = {folder: snapshot.txt_files(folder, files_only=True) for folder in folder_names}
+
+    # In incremental mode, stat the tree and compare it with the manifest of the last run
+    manifest_path = wave_manifest.manifest_path_for(output_csv_name)
+    manifest = wave_manifest.load_manifest(manifest_path, wave3_path, output_csv_name) if incremental else None
+    folders_to_read = set(folder_names)
+    removed = []
+    if manifest is not None:
+        added, removed, changed = wave_manifest.changed_folders(snapshot.stat_map(files_only=True), manifest)
+        folders_to_read = set(added + changed)
+        manifest_folders = manifest["folders"]
+        for folder_name in removed:
+            del manifest_folders[folder_name]
+        print(f"Incremental update: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+    elif incremental:
+        print("No usable manifest found, doing a full rebuild.")
+
+    # Find the max number of .txt files any folder contains (used for dynamic column generation)
+    max_links = max((len(txt_files) for txt_files in folder_files.values()), default=0)
+
+    # Generate column headers: W4.Num, Code, UniversityLink1 ~ UniversityLinkN
+    fieldnames = ["W4.Num", "Code"] + [f"UniversityLink{i}" for i in range(1, max_links + 1)]
+
+    def extract_rows():
+        """
+        Read each folder's text files once and yield its row.
+        Digests of every cell and source file are kept in row_digests for the verification phase.
+        """
+        for idx, folder_name in enumerate(folder_names, 1):
+            folder_path = os.path.join(wave3_path, folder_name)
+            txt_files = folder_files[folder_name]
+
+            # Warn if the folder has no .txt files
+            if not txt_files:
+                print(f"⚠️ No text files in {folder_name}")
+                manifest_folders[folder_name] = {}
+                continue
+
+            row_numbers[folder_name] = idx
+
+            # Unchanged since the last incremental run: keep the existing CSV row
+            if folder_name not in folders_to_read:
+                continue
+
+            # Initialize row data with ID number and folder name
+            row = {"W4.Num": idx, "Code": folder_name}
+            records = manifest_folders[folder_name] = {}
+            digests = row_digests[folder_name] = []
+
+            # Read content of each .txt file and store in row
+            for i, txt_file in enumerate(txt_files, 1):
+                file_path = os.path.join(folder_path, txt_file)
+                file_digest = None
+                try:
+                    t0 = time.perf_counter()
+                    raw, size, mtime_ns = wave_source.read_source(wave3_path, folder_name, txt_file)
+                    t1 = time.perf_counter()
+                    file_digest = hashlib.sha256(raw).hexdigest()
+                    records[txt_file] = {"size": size, "mtime_ns": mtime_ns, "sha256": file_digest}
+                    t2 = time.perf_counter()
+                    text = wave_manifest.decode_text(raw)  # Decode as UTF-8 text
+                    t3 = time.perf_counter()
+                    content = text.strip()  # Strip whitespace
+                    row[f"UniversityLink{i}"] = content  # Add to CSV row
+                    if profile.enabled:
+                        profile.record_file(folder_name, txt_file, len(raw), {
+                            "reading": t1 - t0, "hashing": t2 - t1,
+                            "decoding": t3 - t2, "stripping": time.perf_counter() - t3})
+                except Exception as e:
+                    # If reading fails, record the error and insert placeholder
+                    error_msg = f"Error reading {file_path}: {str(e)}"
+                    print(error_msg)
+                    row[f"UniversityLink{i}"] = "ERROR_READING_FILE"
+                    file_digest = None  # Nothing trustworthy to verify against; re-read during verification
+                    try:  # Recorded without a digest, so the folder is only re-read once the entry changes
+                        size, mtime_ns = wave_source.stat_source(wave3_path, folder_name, txt_file)
+                        records[txt_file] = {"size": size, "mtime_ns": mtime_ns, "sha256": None}
+                    except OSError:
+                        pass
+                    mismatches.append({
+                        "Folder": folder_name,
+                        "File": txt_file,
+                        "Error": error_msg,
+                        "Type": "Read Error"
+                    })
+                cell = row[f"UniversityLink{i}"]
+                digests.append((text_digest(cell), file_digest))
+                if store is not None and cell and file_digest is not None:
+                    row[f"UniversityLink{i}"] = store.put(cell)  # The CSV gets the text's reference
+
+            yield row
+
+    # ===== Write Main CSV =====
+    row_numbers = {}  # W4.Num of every university that gets a row
 
-                # Compare CSV value with file content
-                if strict_validation and (csv_value != file_content):
+    if manifest is not None:
+        # Patch only the re-read universities into the existing CSV
+        for row in extract_rows():
+            changed_rows[row["Code"]] = row
+        if folders_to_read or removed:
+            with profile.stage("writing_csv"):
+                wave_manifest.patch_output_csv(output_csv_name, fieldnames, changed_rows, set(removed), row_numbers)
+        changed_rows.clear()
+    else:
+        # Write each row as soon as it is read, so the texts are never all in memory at once
+        with compressed_io.open_csv(output_csv_name, "w") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            writer.writeheader()           # Write header row
+            for row in extract_rows():
+                with profile.stage("writing_csv"):
+                    writer.writerow(row)   # Write this university row
+
+    # Record what went into the CSV so the next incremental run can skip unchanged folders
+    if incremental:
+        with profile.stage("manifest"):
+            wave_manifest.save_manifest(manifest_path, wave3_path, output_csv_name, manifest_folders)
+
+    # Confirm success
+    print(f"\n✅ Data saved to: {output_csv_name}")
+    print(f"Total universities processed: {len(row_digests)}")
+    if store is not None:
+        print(store.summary())
+    if manifest is not None:
+        print(f"Unchanged universities skipped: {len(row_numbers) - len(row_digests)}")
+
+    # ===== Strict Verification Phase =====
+    print("\n🔍 Starting STRICT verification...")
+
+    # Stream the written CSV back and check each cell, and each source file, against the
+    # digests captured at extraction time. Full texts are only loaded to log a mismatch.
+    csv.field_size_limit(sys.maxsize)  # Handle large text fields
+    verified_codes = set()
+    checked_refs = {}  # Store reference -> stored text still matches, so shared texts are checked once
+    verification_start = time.perf_counter()
+    with compressed_io.open_csv(output_csv_name) as csv_file:
+        for row in csv.DictReader(csv_file):
+            folder_name = row["Code"]
+            if folder_name not in row_digests:
+                continue  # Not re-read in this run
+            verified_codes.add(folder_name)
+            folder_path = os.path.join(wave3_path, folder_name)
+
+            for i, txt_file in enumerate(folder_files[folder_name], 1):
+                file_path = os.path.join(folder_path, txt_file)
+                csv_value = row.get(f"UniversityLink{i}") or ""  # Get value from CSV
+                cell_digest, file_digest = row_digests[folder_name][i - 1]
+
+                try:
+                    if file_digest is None:
+                        # The extraction read failed, so try the file again the slow way
+                        file_content = read_text(wave3_path, folder_name, txt_file)
+                        matches = text_digest(csv_value) == text_digest(file_content)
+                    else:
+                        # The CSV cell must hold what was extracted, and the file must still have the same bytes
+                        if store is not None and content_store.is_ref(csv_value):
+                            if csv_value not in checked_refs:
+                                checked_refs[csv_value] = store.check(csv_value)
+                            cell_matches = (content_store.ref_digest(csv_value) == cell_digest
+                                            and checked_refs[csv_value])
+                        else:
+                            cell_matches = text_digest(csv_value) == cell_digest
+                        matches = (cell_matches
+                                   and wave_source.source_digest(wave3_path, folder_name, txt_file) == file_digest)
+                        file_content = None
+
+                    # Compare CSV value with file content
+                    if strict_validation and not matches:
+                        mismatches.append({
+                            "Folder": folder_name,
+                            "File": txt_file,
+                            "CSV Value": csv_value,
+                            "File Content": (file_content if file_content is not None
+                                             else read_text(wave3_path, folder_name, txt_file)),
+                            "Error": "EXACT CONTENT MISMATCH",
+                            "Type": "Content Mismatch"
+                        })
+                except Exception as e:
+                    # If verification fails, log the issue
+                    error_msg = f"Verification failed for {file_path}: {str(e)}"
+                    print(error_msg)
                     mismatches.append({
                         "Folder": folder_name,
                         "File": txt_file,
-                        "CSV Value": csv_value,
-                        "File Content": file_content,
-                        "Error": "EXACT CONTENT MISMATCH",
-                        "Type": "Content Mismatch"
+                        "Error": error_msg,
+                        "Type": "Verification Error"
                     })
-        except Exception as e:
-            # If verification fails, log the issue
-            error_msg = f"Verification failed for {file_path}: {str(e)}"
-            print(error_msg)
-            mismatches.append({
-                "Folder": folder_name,
-                "File": txt_file,
-                "Error": error_msg,
-                "Type": "Verification Error"
-            })
-
-# ===== Results Summary =====
-if not mismatches:
-    print("✅ Perfect match! All CSV entries EXACTLY match source files.")
-else:
-    print(f"\n❌ Found {len(mismatches)} issues:")
-
-    # Print the first 5 issues
-    for issue in mismatches[:5]:
-        print(f"\n→ Folder: {issue['Folder']}/{issue['File']}")
-        print(f"   Error Type: {issue['Type']}")
-        if 'CSV Value' in issue:
-            print(f"   CSV Value: {issue['CSV Value']}")
-            print(f"   File Content: {issue['File Content']}")
-        print(f"   Error: {issue['Error']}")
-
-    # Save mismatch details to a timestamped CSV
-    mismatch_log_path = f"mismatches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    with open(mismatch_log_path, mode='w', newline='', encoding='utf-8') as log_file:
-        writer = csv.DictWriter(log_file, fieldnames=["Folder", "File", "CSV Value", "File Content", "Error", "Type"])
-        writer.writeheader()
-        writer.writerows(mismatches)
-    print(f"\n📝 Mismatch details saved to: {mismatch_log_path}")
-
-# ===== Final Stats =====
-# Count universities that passed without any issues
-success_count = len(output_data) - len([m for m in mismatches if m["Type"] != "Read Error"])
-
-# Print final report
-print(f"\n📊 Final stats:")
-print(f"- Universities processed: {len(output_data)}")
-print(f"- Perfect matches: {success_count}")
-print(f"- Errors detected: {len(mismatches)}")
-print(f"  → Content mismatches: {len([m for m in mismatches if m['Type'] == 'Content Mismatch'])}")
-print(f"  → Read errors: {len([m for m in mismatches if m['Type'] == 'Read Error'])}")
-print(f"  → Other issues: {len([m for m in mismatches if m['Type'] not in ['Content Mismatch', 'Read Error']])}")
\ No newline at end of file
+
+    profile.add_time("verification", time.perf_counter() - verification_start)
+
+    # Every extracted university must have made it into the CSV
+    for folder_name in sorted(set(row_digests) - verified_codes):
+        mismatches.append({
+            "Folder": folder_name,
+            "File": "",
+            "Error": f"Row for {folder_name} not found in {output_csv_name}",
+            "Type": "Verification Error"
+        })
+
+    return report_results(mismatches, len(row_digests))
+
+
+def stripped_texts(wave3_path, folder_name, txt_files, stripper):
+    """
+    The texts main.py writes for a folder's files with boilerplate stripping, as {file name: text}.
+    The stripper needs every file of the folder; files that cannot be read map to None.
+    """
+    texts = []
+    for txt_file in txt_files:
+        try:
+            texts.append(read_text(wave3_path, folder_name, txt_file))
+        except Exception:
+            texts.append(None)
+    return dict(zip(txt_files, stripper.strip(folder_name, texts)))
+
+
+def check_cell(wave3_path, folder_name, txt_file, csv_value, store=None, file_content=None):
+    """
+    Compare one CSV cell with its source file. Returns a mismatch record, or None if they match.
+    file_content is the expected text if the caller already has it (e.g. after stripping).
+    """
+    try:
+        if file_content is None:
+            file_content = read_text(wave3_path, folder_name, txt_file)
+    except Exception as e:
+        return {"Folder": folder_name, "File": txt_file,
+                "Error": f"Error reading {os.path.join(wave3_path, folder_name, txt_file)}: {str(e)}",
+                "Type": "Read Error"}
+
+    if content_store.is_ref(csv_value):
+        # The stored text is only opened when the digest (and the recorded length, if any) agree
+        length = content_store.ref_length(csv_value)
+        matches = ((length is None or length == len(file_content))
+                   and content_store.ref_digest(csv_value) == text_digest(file_content)
+                   and (store is None or store.check(csv_value)))
+    else:
+        matches = csv_value == file_content
+    if matches:
+        return None
+    return {"Folder": folder_name, "File": txt_file, "CSV Value": csv_value, "File Content": file_content,
+            "Error": "EXACT CONTENT MISMATCH", "Type": "Content Mismatch"}
+
+
+def stratified_sample(snapshot, size, seed, strata):
+    """
+    Pick a reproducible sample of the wave's .txt files, stratified by file size.
+    Files are sorted by size and cut into `strata` classes with equal numbers of files;
+    each class gets a share of the sample in proportion to its size (at least one file).
+    Returns (total number of files, [(files in the class, sampled (code, txt file) pairs)]).
+    """
+    files = sorted((snapshot.folders[code][name][0], code, name)
+                   for code in snapshot.folder_names() for name in snapshot.txt_files(code, files_only=True))
+    rng = random.Random(seed)
+    classes = []
+    for h in range(strata):
+        members = files[h * len(files) // strata:(h + 1) * len(files) // strata]
+        if members:
+            take = min(len(members), max(1, round(size * len(members) / len(files))))
+            classes.append((len(members), [(code, name) for _, code, name in rng.sample(members, take)]))
+    return len(files), classes
+
+
+def mismatch_estimate(classes, confidence=0.95):
+    """
+    Stratified estimate of the share of mismatching files, with a one-sided upper bound.
+    classes: [(files in the class, files checked, mismatching files)]. The bound is a Wilson
+    score bound on the effective sample size of the stratified estimate.
+    """
+    total = sum(population for population, _, _ in classes)
+    checked = sum(n for _, n, _ in classes)
+    rate = sum(population / total * bad / n for population, n, bad in classes)
+    if checked >= total:
+        return rate, rate  # Every file was checked: the rate is exact
+    variance = sum((population / total) ** 2 * (bad / n) * (1 - bad / n) / n * (1 - n / population)
+                   for population, n, bad in classes)
+    effective = rate * (1 - rate) / variance if variance > 0 else checked
+    z = NormalDist().inv_cdf(confidence)
+    upper = (rate + z * z / (2 * effective)
+             + z * math.sqrt(rate * (1 - rate) / effective + z * z / (4 * effective ** 2))) / (1 + z * z / effective)
+    return rate, min(1.0, upper)
+
+
+def verify_existing(wave3_path, output_csv_name, sample=True, store_dir=None):
+    """
+    Check an existing CSV (or .db / shard manifest) against the source files without extracting it.
+    With sample=True only a stratified random sample of the files is checked (see the sample_* settings);
+    otherwise every file is. Returns the same summary dict as verify_content, plus the estimate.
+    """
+    if not os.path.exists(wave3_path):
+        raise FileNotFoundError(f"Directory not found: {wave3_path}")
+    # References (a content store, or pages spilled by main.py's spill_threshold) are looked up
+    # in store_dir, or in "content_store" next to the output, once the first one is met
+    store = content_store.LazyStore(output_csv_name, store_dir)
+    snapshot = wave_scanner.get_snapshot(wave3_path, refresh=True)
+    stripper = None
+    if strip_boilerplate:
+        stripper = boilerplate.saved_stripper(output_csv_name, boilerplate_university_share, boilerplate_wave_share)
+        if stripper is None:
+            raise ValueError(f"{boilerplate.blocks_path_for(output_csv_name)} not found (or saved with another "
+                             f"boilerplate_wave_share); it is needed to strip the files the way main.py did")
+
+    if sample:
+        total, classes = stratified_sample(snapshot, sample_size, sample_seed, sample_strata)
+        wanted = {}
+        for _, pairs in classes:
+            for code, name in pairs:
+                wanted.setdefault(code, set()).add(name)
+        print(f"\n🎲 Checking a sample of {sum(len(names) for names in wanted.values())} of {total} files "
+              f"in {len(wanted)} universities (seed {sample_seed})")
+        rows = output_source.read_output_rows(output_csv_name, list(wanted))
+        row_items = ((code, rows.get(code)) for code in sorted(wanted))
+    else:
+        print(f"\n🔍 Checking every file behind {output_csv_name}")
+        wanted = {code: set(snapshot.txt_files(code, files_only=True)) for code in snapshot.folder_names()
+                  if snapshot.txt_files(code, files_only=True)}
+        row_items = ((row["Code"], row) for row in output_source.iter_output_rows(output_csv_name))
+
+    mismatches = []
+    bad_files = set()
+    seen_codes = set()
+    for code, row in row_items:
+        if code not in wanted or row is None:
+            continue
+        seen_codes.add(code)
+        expected = {}
+        if stripper:  # Stripping depends on all of the folder's pages, as main.py read them
+            expected = stripped_texts(wave3_path, code, snapshot.txt_files(code), stripper)
+        for i, txt_file in enumerate(snapshot.txt_files(code, files_only=True), 1):
+            if txt_file in wanted[code]:
+                issue = check_cell(wave3_path, code, txt_file, row.get(f"UniversityLink{i}") or "", store,
+                                   expected.get(txt_file))
+                if issue is not None:
+                    mismatches.append(issue)
+                    bad_files.add((code, txt_file))
+    for code in sorted(set(wanted) - seen_codes):
+        mismatches.append({"Folder": code, "File": "", "Error": f"Row for {code} not found in {output_csv_name}",
+                           "Type": "Verification Error"})
+        bad_files.update((code, name) for name in wanted[code])
+
+    escalate = bool(mismatches) and sample and escalate_to_full
+    summary = report_results(mismatches, len(wanted), write_log=not escalate)
+    if sample:
+        rate, upper = mismatch_estimate([(population, len(pairs), sum(1 for pair in pairs if pair in bad_files))
+                                         for population, pairs in classes], sample_confidence)
+        print(f"- Estimated mismatching files: {rate:.2%} of {total} "
+              f"({sample_confidence:.0%} upper bound: {upper:.2%})")
+        summary.update(estimated_rate=rate, upper_bound=upper)
+    if escalate:
+        print("\n⚠️ The sample found problems, checking every file...")
+        return verify_existing(wave3_path, output_csv_name, sample=False, store_dir=store_dir)
+    return summary
+
+
+def report_results(mismatches, processed, write_log=True):
+    """
+    Print the results summary and final stats, and save the mismatches to a
+    timestamped mismatches_*.csv log (unless write_log is False). Returns the summary dict.
+    """
+    # ===== Results Summary =====
+    if not mismatches:
+        print("✅ Perfect match! All CSV entries EXACTLY match source files.")
+    else:
+        print(f"\n❌ Found {len(mismatches)} issues:")
+
+        # Print the first 5 issues
+        for issue in mismatches[:5]:
+            print(f"\n→ Folder: {issue['Folder']}/{issue['File']}")
+            print(f"   Error Type: {issue['Type']}")
+            if 'CSV Value' in issue:
+                print(f"   CSV Value: {issue['CSV Value']}")
+                print(f"   File Content: {issue['File Content']}")
+            print(f"   Error: {issue['Error']}")
+
+    if mismatches and write_log:
+        # Save mismatch details to a timestamped CSV
+        mismatch_log_path = f"mismatches_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        with open(mismatch_log_path, mode='w', newline='', encoding='utf-8') as log_file:
+            writer = csv.DictWriter(log_file, fieldnames=["Folder", "File", "CSV Value", "File Content", "Error", "Type"])
+            writer.writeheader()
+            writer.writerows(mismatches)
+        print(f"\n📝 Mismatch details saved to: {mismatch_log_path}")
+
+    # ===== Final Stats =====
+    # Count universities that passed without any issues
+    success_count = processed - len([m for m in mismatches if m["Type"] != "Read Error"])
+
+    # Print final report
+    print(f"\n📊 Final stats:")
+    print(f"- Universities processed: {processed}")
+    print(f"- Perfect matches: {success_count}")
+    print(f"- Errors detected: {len(mismatches)}")
+    print(f"  → Content mismatches: {len([m for m in mismatches if m['Type'] == 'Content Mismatch'])}")
+    print(f"  → Read errors: {len([m for m in mismatches if m['Type'] == 'Read Error'])}")
+    print(f"  → Other issues: {len([m for m in mismatches if m['Type'] not in ['Content Mismatch', 'Read Error']])}")
+
+    return {
+        "processed": processed,
+        "perfect_matches": success_count,
+        "errors": len(mismatches),
+    }
+
+
+if __name__ == "__main__":
+    # Instrumentation is a no-op unless profile_run is set
+    run = run_profile.RunProfile(cprofile=profile_cprofile) if profile_run else run_profile.NULL_PROFILE
+    run.start()
+    try:
+        if sample_verification:
+            verify_existing(wave3_path, output_csv_name, store_dir=content_store_path)
+        else:
+            verify_content(wave3_path, output_csv_name, run, content_store_path)
+    finally:
+        if run.enabled:
+            print(f"\n⏱️ Profile report saved to: {run.write_report(run_profile.profile_path_for(output_csv_name))}")
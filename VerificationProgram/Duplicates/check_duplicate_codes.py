@@ -1,33 +1,42 @@
 """
 This script checks for duplicate university 'Code' entries in a CSV file
 (e.g., output_wave3_content_ordered.csv). It prints a summary of any codes
-that appear more than once.
+that appear more than once. The SQLite database written by main.py
+(a ".db" path) or a shard manifest (".shards.json") can be checked the same
+way; shards are scanned in parallel. Only the Code column is decoded: the
+page texts are skipped as raw bytes (see Common/lazy_csv.py).
 """
 
-import csv     # Module for reading CSV files
-import sys     # Used to increase the maximum CSV field size (for large text cells)
+import os      # Used to locate the shared helpers
+import sys     # Used to extend the module search path
 
-def find_duplicate_codes(csv_file):
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+from itertools import chain
+from output_source import map_output_parts, output_codes
+
+def duplicate_codes(codes):
     """
-    Returns a set of duplicate 'Code' values in the CSV file.
-    This helps detect if any university code appears more than once in the dataset.
+    Returns the set of values that appear more than once in an iterable of codes.
+    Shared with run_all_checks.py, which feeds it the Code column of its single CSV pass.
     """
-    csv.field_size_limit(sys.maxsize)  # Handle large text fields (some cells may exceed default limits)
-
-    codes = set()        # To track unique codes seen so far
+    seen = set()         # To track unique codes seen so far
     duplicates = set()   # To collect any codes that appear more than once
+    for code in codes:
+        if code in seen:
+            duplicates.add(code)  # Already seen? Add to duplicates
+        seen.add(code)            # Track this code
+    return duplicates
 
-    # Open the CSV file and read it using DictReader for column-based access
-    with open(csv_file, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            code = row['Code']  # Get the university code from the current row
-
-            if code in codes:
-                duplicates.add(code)  # Already seen? Add to duplicates
-            codes.add(code)          # Track this code
 
-    return duplicates  # Return the set of duplicates (if any)
+def find_duplicate_codes(csv_file):
+    """
+    Returns a set of duplicate 'Code' values in the CSV file.
+    This helps detect if any university code appears more than once in the dataset.
+    """
+    # Collect the Code column of every part (one part, or each shard in parallel)
+    codes = chain.from_iterable(map_output_parts(csv_file, output_codes))
+    return duplicate_codes(codes)  # Return the set of duplicates (if any)
 
 
 # Only run this block if the script is executed directly
@@ -0,0 +1,263 @@
+"""
+This script finds pages that are (nearly) the same under different universities
+in the output CSV (e.g., output_wave3_content_ordered.csv): content filed under
+the wrong code (abbreviation mix-ups like "asu"), or one page saved into two
+folders. check_duplicate_codes.py only catches repeated Code values.
+
+How it works:
+    - Every page is split into overlapping 5-word shingles ("shingle_words"), and
+      pages are compared by the Jaccard similarity of their shingle sets.
+    - Each page gets a MinHash signature of num_perm values, built in one pass
+      over its shingles (one-permutation hashing: each shingle hash lands in one
+      of num_perm bins and each bin keeps its smallest value; empty bins borrow
+      from the next filled bin). The fraction of equal values in two signatures
+      estimates their similarity.
+    - Locality-sensitive hashing: signatures are cut into bands, and only pages
+      that share a whole band in some hash bucket are compared. The band size is
+      picked from similarity_threshold, so a pair at the threshold is compared
+      with at least 95% probability (more above it), and pairs far below it
+      rarely are. There is no all-pairs comparison, so the run time grows about
+      linearly with the number of pages.
+    - Identical texts are grouped by their SHA-256 first and handled once.
+
+Similar pages are joined into clusters. Every cluster that spans more than one
+university is written to report_path, one row per page, with the estimated
+similarity to the cluster's most common page. The university pairs that share the
+most similar pages are printed at the end.
+
+The CSV path may also be a .db, a shard manifest or a compressed CSV. If the CSV
+was written with a content store or with spilled long pages (cells hold
+"sha256:..." references), the texts are loaded from content_store_path, or from
+"content_store" next to the CSV when it is not set.
+"""
+
+import os
+import re
+import sys
+import csv
+import hashlib
+from collections import defaultdict, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+from output_source import iter_output_rows
+import content_store
+
+# Configuration
+csv_file = "../../outputCvs/output_wave3_content_ordered.csv"
+report_path = "../../outputCvs/near_duplicates_wave3.csv"  # One row per page of every cluster
+content_store_path = None     # Store folder, if the CSV holds "sha256:..." references (None = next to the CSV)
+similarity_threshold = 0.8    # Estimated Jaccard similarity of the word shingles
+shingle_words = 5             # Words per shingle
+num_perm = 128                # Signature length (a power of two); longer = more exact, slower
+min_words = 50                # Shorter pages are skipped (error pages, "coming soon", ...)
+cross_code_only = True        # Only report clusters that span more than one university
+workers = None                # Processes that build the signatures (None = one per CPU)
+
+REPORT_FIELDNAMES = ["Cluster", "Code", "Link", "Words", "Similarity"]
+
+_WORD = re.compile(r"\w+")
+_HASH_MASK = (1 << 64) - 1
+_EMPTY_BIN = 1 << 64  # Larger than any shingle hash
+
+
+def shingle_hashes(text, k=5):
+    """Return (number of words, set of 64-bit hashes of the k-word shingles) of a text."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0, set()
+    # Hash each distinct word once, then hash the k-tuples of word hashes in C (tuples of ints hash
+    # the same in every process, unlike strings)
+    word_hashes = {word: int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+                   for word in set(words)}
+    sequence = list(map(word_hashes.__getitem__, words))
+    shingles = zip(*(sequence[i:] for i in range(min(k, len(sequence)))))
+    return len(words), {hash(shingle) & _HASH_MASK for shingle in shingles}
+
+
+def minhash_signature(hashes, size=128):
+    """
+    One-permutation MinHash signature of a set of 64-bit hashes, or None for an empty set.
+    The low bits of a hash pick its bin, the remaining bits are its value.
+    """
+    if not hashes:
+        return None
+    shift = size.bit_length() - 1
+    mask = size - 1
+    signature = [_EMPTY_BIN] * size
+    for h in hashes:
+        b = h & mask
+        value = h >> shift
+        if value < signature[b]:
+            signature[b] = value
+
+    # Densify: an empty bin takes the value of the next filled bin to its right, offset by the
+    # distance, so two pages still agree on it with a probability equal to their similarity
+    if _EMPTY_BIN in signature:
+        offset = 1 << (64 - shift)
+        filled = signature[:]
+        for b in range(size):
+            if filled[b] == _EMPTY_BIN:
+                distance = 1
+                while filled[(b + distance) & mask] == _EMPTY_BIN:
+                    distance += 1
+                signature[b] = filled[(b + distance) & mask] + distance * offset
+    return tuple(signature)
+
+
+def page_signature(text, k=5, size=128):
+    """Worker: (number of words, MinHash signature) of one page."""
+    word_count, hashes = shingle_hashes(text, k)
+    return word_count, minhash_signature(hashes, size)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def lsh_bands(size, threshold, recall=0.95):
+    """
+    Pick (bands, rows per band) for a signature length: the widest bands (fewest candidate
+    pairs) that still make a pair at the threshold a candidate with probability >= recall.
+    A pair of similarity s shares at least one band with probability 1 - (1 - s**rows)**bands.
+    """
+    for rows in range(size, 0, -1):
+        bands = size // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return size, 1
+
+
+def _find(parent, i):
+    """Union-find root with path halving."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def page_texts(csv_file, store_dir=None):
+    """
+    Yield (code, link name, digest, text or None) for every non-empty page.
+    text is None when the same digest was already yielded, so each distinct text is loaded once.
+    """
+    store = content_store.LazyStore(csv_file, store_dir)
+    seen = set()
+    for row in iter_output_rows(csv_file):
+        for key, value in row.items():
+            if not key.startswith("UniversityLink") or not value or value == "ERROR_READING_FILE":
+                continue
+            if content_store.is_ref(value):
+                digest = content_store.ref_digest(value)
+                text = store.get(value) if digest not in seen else None
+            else:
+                digest = hashlib.sha256(value.encode('utf-8')).hexdigest()
+                text = value if digest not in seen else None
+            seen.add(digest)
+            yield row["Code"], key, digest, text
+
+
+def find_near_duplicates(csv_file, threshold=0.8, store_dir=None):
+    """
+    Returns a list of clusters, largest first. Each cluster is a list of
+    {"Code", "Link", "Words", "Similarity"} dicts, one per page.
+    """
+    locations = defaultdict(list)  # digest -> [(code, link name)]
+    words = {}                     # digest -> number of words
+    signatures = {}                # digest -> signature (long enough pages only)
+
+    # Build the signatures in worker processes; keep a bounded number of texts in flight
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        window = 4 * (workers or os.cpu_count() or 1)
+        pages = page_texts(csv_file, store_dir)
+        while True:
+            for code, link, digest, text in islice(pages, window - len(pending)):
+                locations[digest].append((code, link))
+                if text is not None:
+                    pending.append((digest, executor.submit(page_signature, text, shingle_words, num_perm)))
+            if not pending:
+                break
+            digest, future = pending.popleft()
+            word_count, signature = future.result()
+            words[digest] = word_count
+            if word_count >= min_words and signature is not None:
+                signatures[digest] = signature
+
+    # LSH: pages that share every value of at least one band land in the same bucket
+    digests = list(signatures)
+    bands, rows = lsh_bands(num_perm, threshold)
+    parent = list(range(len(digests)))
+    compared = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, digest in enumerate(digests):
+            buckets[signatures[digest][band * rows:(band + 1) * rows]].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pair = (members[x], members[y])
+                    if pair in compared:
+                        continue
+                    compared.add(pair)
+                    if similarity(signatures[digests[pair[0]]], signatures[digests[pair[1]]]) >= threshold:
+                        parent[_find(parent, pair[0])] = _find(parent, pair[1])
+
+    groups = defaultdict(list)
+    for i, digest in enumerate(digests):
+        groups[_find(parent, i)].append(digest)
+    clusters = []
+    for members in groups.values():
+        places = [(code, link, digest) for digest in members for code, link in locations[digest]]
+        if len(places) < 2 or (cross_code_only and len({code for code, _, _ in places}) < 2):
+            continue
+        # Compare every page with the text that appears most often in the cluster
+        representative = max(members, key=lambda d: (len(locations[d]), words[d]))
+        cluster = []
+        for code, link, digest in sorted(places):
+            score = similarity(signatures[digest], signatures[representative])
+            cluster.append({"Code": code, "Link": link, "Words": words[digest], "Similarity": round(score, 3)})
+        clusters.append(cluster)
+    clusters.sort(key=lambda c: (-len(c), c[0]["Code"], c[0]["Link"]))
+    return clusters
+
+
+def write_report(report_path, clusters):
+    """Write the clusters to a CSV atomically, one row per page."""
+    tmp_path = report_path + ".tmp"
+    with open(tmp_path, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDNAMES)
+        writer.writeheader()
+        for number, cluster in enumerate(clusters, start=1):
+            for page in cluster:
+                writer.writerow({"Cluster": number, **page})
+    os.replace(tmp_path, report_path)
+
+
+def shared_code_pairs(clusters):
+    """Count, for every pair of universities, the clusters they share. Most shared first."""
+    counts = defaultdict(int)
+    for cluster in clusters:
+        codes = sorted({page["Code"] for page in cluster})
+        for x in range(len(codes)):
+            for y in range(x + 1, len(codes)):
+                counts[(codes[x], codes[y])] += 1
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+# Only run this block if the script is executed directly
+if __name__ == "__main__":
+    clusters = find_near_duplicates(csv_file, similarity_threshold, content_store_path)
+
+    if clusters:
+        write_report(report_path, clusters)
+        pages = sum(len(cluster) for cluster in clusters)
+        print(f"❌ **NEAR-DUPLICATE PAGES FOUND**: {len(clusters)} clusters, {pages} pages")
+        for (code_a, code_b), shared in shared_code_pairs(clusters)[:20]:
+            print(f"   {code_a} ↔ {code_b}: {shared} similar page(s)")
+        print(f"Report saved to: {report_path}")
+    else:
+        print(f"✅ **NO NEAR-DUPLICATE PAGES FOUND** (similarity ≥ {similarity_threshold})")
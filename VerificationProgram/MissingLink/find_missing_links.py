@@ -10,75 +10,86 @@ Output:
     - Lists files in the folder and corresponding CSV links
     - Prints any missing files (present in folder but missing in CSV)
     - Flags extra files listed in the CSV but not found in the folder
+
+Rows are looked up through a byte-offset index saved next to the CSV
+("<csv>.index.json", rebuilt automatically when the CSV changes), so checking
+one university, or a batch of them, does not rescan the whole file. The CSV path
+may also point at the SQLite database written by main.py or at a shard manifest.
 """
 
 import os
 import csv
 import sys
 
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+from output_source import read_output_rows
+import wave_scanner
+
+
+def list_txt_files(base_dir, code):
+    """List the names of all .txt files in a university folder (recursively)."""
+    return wave_scanner.get_snapshot(base_dir).all_txt_names(code)
+
 
-def list_txt_files(folder_path):
-    """List all .txt files in a folder (recursively)."""
-    txt_files = []
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.endswith(".txt"):
-                txt_files.append(os.path.join(root, file))
-    return txt_files
+def row_links(row):
+    """Collect all fields of a row that start with "UniversityLink" and are not empty."""
+    return [row[key] for key in row.keys()
+            if key.startswith("UniversityLink") and row[key].strip()]
 
 
 def get_csv_links(csv_file, target_code):
-    """Get all links for a specific university from the CSV."""
-    # Increase field size limit to handle large fields
-    csv.field_size_limit(sys.maxsize)
+    """Get all links for a specific university from the CSV (seeks straight to its row)."""
+    row = read_output_rows(csv_file, [target_code]).get(target_code)
+    return row_links(row) if row is not None else []
+
+
+def csv_link_names(csv_links):
+    """Turn CSV link values into file names (local path, URL, or plain name)."""
+    csv_files = set()
+    for link in csv_links:
+        if os.path.isfile(link):  # If link is a local file path
+            csv_files.add(os.path.basename(link))
+        elif link.startswith(('http://', 'https://')):  # If it's a URL
+            csv_files.add(os.path.basename(link.split('/')[-1]))
+        else:  # Plain string fallback (likely just file name)
+            csv_files.add(link)
+    return csv_files
+
 
-    links = []
-    with open(csv_file, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['Code'] == target_code:
-                # Collect all fields that start with "UniversityLink" and are not empty
-                links = [row[key] for key in row.keys()
-                         if key.startswith("UniversityLink") and row[key].strip()]
-                break
-    return links
+def compare_link_names(folder_files, csv_links):
+    """
+    Compare folder file names with the file names referenced by CSV links.
+    Returns (missing_in_csv, extra_in_csv) as sets.
+    """
+    csv_files = csv_link_names(csv_links)
+    return set(folder_files) - csv_files, csv_files - set(folder_files)
 
 
-def compare_links_to_files(csv_file, base_dir, target_code):
+def compare_links_to_files(csv_file, base_dir, target_code, csv_links=None):
     """Compare CSV links to actual .txt files in the folder."""
     # Get all .txt files in the university's folder
     university_folder = os.path.join(base_dir, target_code)
-    if not os.path.exists(university_folder):
+    if target_code not in wave_scanner.get_snapshot(base_dir).folders:
         print(f"❌ Folder not found: {university_folder}")
         return
 
     # List .txt files found in the folder
-    txt_files = list_txt_files(university_folder)
+    txt_files = list_txt_files(base_dir, target_code)
     print(f"\n📁 Files in folder '{target_code}':")
     for file in sorted(txt_files):  # Sort for readability
-        print(f"  - {os.path.basename(file)}")
+        print(f"  - {file}")
 
-    # Get list of links from the CSV
-    csv_links = get_csv_links(csv_file, target_code)
+    # Get list of links from the CSV (unless the caller already looked them up)
+    if csv_links is None:
+        csv_links = get_csv_links(csv_file, target_code)
     print(f"\n📄 Links in CSV for '{target_code}':")
     for i, link in enumerate(csv_links, 1):
         print(f"  - UniversityLink{i}: {link}")
 
-    # Compare folder filenames vs CSV filenames
-    folder_files = {os.path.basename(f) for f in txt_files}
-    csv_files = set()
-
-    for link in csv_links:
-        if os.path.isfile(link):  # If link is a local file path
-            csv_files.add(os.path.basename(link))
-        elif link.startswith(('http://', 'https://')):  # If it's a URL
-            csv_files.add(os.path.basename(link.split('/')[-1]))
-        else:  # Plain string fallback (likely just file name)
-            csv_files.add(link)
-
-    # Detect mismatches
-    missing_in_csv = folder_files - csv_files
-    extra_in_csv = csv_files - folder_files
+    # Compare folder filenames vs CSV filenames and detect mismatches
+    folder_files = set(txt_files)
+    missing_in_csv, extra_in_csv = compare_link_names(folder_files, csv_links)
 
     # Print results
     if missing_in_csv:
@@ -90,14 +101,37 @@ def compare_links_to_files(csv_file, base_dir, target_code):
         print(f"\n⚠️ Extra in CSV (not in folder): {extra_in_csv}")
 
 
+def flagged_codes(csv_file, base_dir):
+    """Codes whose number of links does not match their .txt files (see verify_link_counts.py)."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SubfolderLink_vs_CSVLink_Matches"))
+    from verify_link_counts import verify_link_counts
+    return [code for code, _, _ in verify_link_counts(csv_file, base_dir)]
+
+
+def compare_links_for_codes(csv_file, base_dir, target_codes):
+    """
+    Run compare_links_to_files for several universities.
+    target_codes is a list of codes, or "all flagged" for every code whose link
+    count does not match its folder. All rows are fetched through the index in one go.
+    """
+    if target_codes == "all flagged":
+        target_codes = flagged_codes(csv_file, base_dir)
+        print(f"Flagged universities: {len(target_codes)}")
+
+    rows = read_output_rows(csv_file, target_codes)
+    for code in target_codes:
+        row = rows.get(code)
+        compare_links_to_files(csv_file, base_dir, code, row_links(row) if row is not None else [])
+
+
 if __name__ == "__main__":
-    # Configure file paths and target university code
+    # Configure file paths and target university codes
     csv_file = "../../outputCvs/output_wave3_content_ordered.csv"
     base_dir = "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles"
-    target_code = "msu"  # The university code you're debugging
+    target_codes = ["msu"]  # The university codes you're debugging, or "all flagged"
 
     # Set the CSV field size limit again (in case it wasn't already done)
     csv.field_size_limit(sys.maxsize)
 
     # Run the comparison
-    compare_links_to_files(csv_file, base_dir, target_code)
\ No newline at end of file
+    compare_links_for_codes(csv_file, base_dir, target_codes)
@@ -1,10 +1,15 @@
 import os  # Import the os module for interacting with the file system
+import sys  # Import the sys module to extend the module search path
+
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+import wave_scanner
 
 # Define the path to the main folder containing all university subfolders
 folder_path = '/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles'
 
-# List all items in the folder and keep only those that are directories (i.e., subfolders)
-subfolders = [f for f in os.listdir(folder_path) if os.path.isdir(os.path.join(folder_path, f))]
+# Take (or reuse) a snapshot of the folder; it only keeps directories as university folders
+subfolders = wave_scanner.get_snapshot(folder_path).folder_names()
 
 # Print the total number of university subfolders found
 print(f"Number of subfolders: {len(subfolders)}")
\ No newline at end of file
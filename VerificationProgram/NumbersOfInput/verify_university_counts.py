@@ -1,32 +1,31 @@
 """
 This script verifies that the number of university folders in the input directory
-matches the number of rows in the generated CSV output.
+matches the number of rows in the generated CSV output (or SQLite database,
+or shard manifest).
 """
 
 import os  # Module to interact with the file system
-import csv  # Module to handle CSV file operations
-import sys  # Module used here to increase CSV field size limit
+import sys  # Module used here to extend the module search path
+
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+from output_source import count_output_rows
+import wave_scanner
 
 
 def count_subfolders(directory):
     """Count the number of subfolders in a given directory."""
-    # List all items in the directory and filter only those that are directories
-    subfolders = [
-        f for f in os.listdir(directory)
-        if os.path.isdir(os.path.join(directory, f))
-    ]
+    # Take (or reuse) a snapshot of the directory; it only keeps directories as university folders
+    subfolders = wave_scanner.get_snapshot(directory).folder_names()
     return len(subfolders)  # Return the count of valid subfolders
 
 
 def count_csv_rows(csv_file):
-    """Count the number of university entries in the CSV (excluding header)."""
-    # Increase CSV field size limit to handle large text fields in cells
-    csv.field_size_limit(sys.maxsize)  # Set the max field size to system limit
-
-    with open(csv_file, mode='r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        # Count rows and subtract 1 to exclude the header
-        return sum(1 for row in reader) - 1
+    """
+    Count the number of university entries in the CSV (excluding header), SQLite database or shards.
+    A CSV is counted by its line breaks outside quoted cells, without parsing the cells.
+    """
+    return count_output_rows(csv_file)
 
 
 def main():
@@ -6,48 +6,59 @@ Output:
     - Prints a success message if all counts match.
     - Otherwise, prints each mismatch showing the university code, number of links in CSV,
       and number of .txt files in the folder.
+
+The CSV path may also point at the SQLite database written by main.py, or at a
+shard manifest, in which case the shards are checked in parallel.
 """
 
 import os
-import csv
 import sys
 
-# Helper function to count .txt files in a folder
-def count_txt_files_in_folder(folder_path):
-    """Counts the number of .txt files in a given folder."""
-    if not os.path.exists(folder_path):
-        return 0
-    return len([
-        f for f in os.listdir(folder_path)
-        if f.endswith(".txt")
-    ])
+# Make the shared helpers in Common/ importable when this script is run directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Common"))
+from output_source import iter_output_rows, map_output_parts
+import wave_scanner
+
+# Helper function to count the non-empty link columns of one CSV row
+def count_links(row):
+    """Counts the non-empty UniversityLink columns in a CSV row dict."""
+    return sum(
+        1 for key in row.keys()
+        if key.startswith("UniversityLink") and row[key] and row[key].strip()
+    )
 
 # Main function to verify link counts between CSV and folder contents
 def verify_link_counts(csv_file, base_dir):
     """Checks if each university's link count matches its folder's .txt files."""
-    # Set the CSV field size limit to handle large text fields
-    csv.field_size_limit(sys.maxsize)  # Handle large CSV fields
     mismatches = []
+    # Count the .txt files once here; shard workers get the counts instead of scanning the wave again
+    snapshot = wave_scanner.get_snapshot(base_dir)
+    txt_counts = {code: len(snapshot.txt_files(code)) for code in snapshot.folder_names()}
+    for part_mismatches in map_output_parts(csv_file, verify_part_link_counts, txt_counts):
+        mismatches.extend(part_mismatches)
+    return mismatches
+
+# Checks one part of the output (the whole CSV, or one shard)
+def verify_part_link_counts(csv_file, txt_counts):
+    """
+    Returns (code, links in CSV, .txt files in folder) for each mismatched row of one output part.
+    txt_counts maps each university code to its number of .txt files.
+    """
+    mismatches = []
+
+    # Iterate over each university row in the CSV (or SQLite database)
+    for row in iter_output_rows(csv_file):
+        code = row['Code']
+
+        # Count the number of non-empty UniversityLink columns
+        link_count = count_links(row)
+
+        # Count the number of actual .txt files in the corresponding folder
+        txt_count = txt_counts.get(code, 0)
 
-    with open(csv_file, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        # Iterate over each university row in the CSV
-        for row in reader:
-            code = row['Code']
-            folder_path = os.path.join(base_dir, code)
-
-            # Count the number of non-empty UniversityLink columns
-            link_count = sum(
-                1 for key in row.keys()
-                if key.startswith("UniversityLink") and row[key].strip()
-            )
-
-            # Count the number of actual .txt files in the corresponding folder
-            txt_count = count_txt_files_in_folder(folder_path)
-
-            # If the CSV count does not match the folder count, record the mismatch
-            if link_count != txt_count:
-                mismatches.append((code, link_count, txt_count))
+        # If the CSV count does not match the folder count, record the mismatch
+        if link_count != txt_count:
+            mismatches.append((code, link_count, txt_count))
 
     return mismatches
 
@@ -1,26 +1,100 @@
 """
 This function checks each university folder and each .txt file inside it.
 It records how many characters are in each file and flags files that exceed
-the Google Sheets character limit (50,000 characters per cell).
+the character limit: main.py's spill_threshold when it is set (those pages go to
+the content store), otherwise the Google Sheets limit (50,000 characters per cell).
+
+Characters are counted straight from the raw bytes instead of decoding every file
+into a string: every UTF-8 code point has exactly one byte that is not a
+continuation byte (0b10xxxxxx), so the count is the number of bytes minus the
+continuation bytes (minus one per "\r\n", which text mode reads as one "\n").
+Chunks with non-ASCII bytes are also decoded, so files that are not valid UTF-8
+are still reported as errors. Files are read in large chunks, so the check is
+bound by disk speed.
+wave3_path can also be a .zip or .tar(.gz) archive of the wave (see Common/wave_source.py).
 """
 
 import os
+import sys
 import csv
+import codecs
+
+# Make main.py and the shared helpers in Common/ importable when this script is run directly
+_here = os.path.dirname(os.path.abspath(__file__))
+for _folder in (os.path.join("..", "MainProgram"), os.path.join("..", "Common")):
+    sys.path.insert(0, os.path.join(_here, _folder))
+import main  # Shares its spill_threshold
+import wave_scanner
+import wave_source
+import content_store
 
 # Configuration
 wave3_path = "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles"
 check_results_path = "/Users/helanwang/PycharmProjects/divHelan/outputCvs/wave3_character_check_results.csv"  # Output file to save results
-CHARACTER_LIMIT = 50000  # Google Sheets cell character limit
+exact_max_count = True   # False = stop reading a file once it is known to be over the limit (faster, but
+                         # MaxCharacterCount is then only a lower bound for flagged folders)
+validate_utf8 = True     # Report files that are not valid UTF-8, like the text-mode read this check replaced
+                         # (decodes the non-ASCII chunks; False counts such files as if they were valid)
+CHUNK_SIZE = 1 << 20     # Bytes read at a time
+
+CONTINUATION_BYTES = bytes(range(0x80, 0xC0))  # UTF-8 bytes that do not start a character
+
+
+def character_limit():
+    """The character limit files are checked against: main.py's spill_threshold, or the Google Sheets cell limit."""
+    return main.spill_threshold or content_store.CELL_CHARACTER_LIMIT
+
+
+def count_characters(file_path, stop_after=None):
+    """
+    Count the characters of a UTF-8 text file from its raw bytes, the way
+    len(open(file_path, encoding='utf-8').read()) would.
+    If stop_after is given, reading stops as soon as the count exceeds it.
+    Returns (char_count, complete) where complete is False if reading stopped early.
+    """
+    with open(file_path, 'rb') as f:
+        return count_stream_characters(f, stop_after)
+
+
+def count_stream_characters(f, stop_after=None):
+    """count_characters for a file object that is already open in binary mode."""
+    decoder = codecs.getincrementaldecoder('utf-8')() if validate_utf8 else None
+    # A character is at least one byte, so with a threshold there is no point in reading
+    # more than stop_after + 1 bytes before checking the count
+    chunk_size = CHUNK_SIZE if stop_after is None else min(CHUNK_SIZE, stop_after + 1)
+    char_count = 0
+    previous_ended_with_cr = False
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        if decoder is not None and not chunk.isascii():
+            decoder.decode(chunk)  # Raises UnicodeDecodeError on invalid UTF-8
+
+        # Code points, minus "\r\n" pairs (also when split across two chunks)
+        char_count += len(chunk.translate(None, CONTINUATION_BYTES))
+        char_count -= chunk.count(b"\r\n")
+        if previous_ended_with_cr and chunk.startswith(b"\n"):
+            char_count -= 1
+        previous_ended_with_cr = chunk.endswith(b"\r")
+
+        if stop_after is not None and char_count > stop_after:
+            return char_count, False
+    if decoder is not None:
+        decoder.decode(b"", final=True)  # Catch a truncated character at the end of the file
+    return char_count, True
+
 
 def check_character_counts():
-    # Get and sort all university folders
-    folder_names = sorted([f for f in os.listdir(wave3_path) if os.path.isdir(os.path.join(wave3_path, f))])
+    # Get and sort all university folders (from the shared snapshot, if one was saved in this run)
+    snapshot = wave_scanner.get_snapshot(wave3_path)
+    folder_names = snapshot.folder_names()
+    limit = character_limit()
 
     results = []  # Store data for all universities, including those with no issues
 
     for folder_name in folder_names:
-        folder_path = os.path.join(wave3_path, folder_name)
-        txt_files = sorted([f for f in os.listdir(folder_path) if f.endswith(".txt")])
+        txt_files = snapshot.txt_files(folder_name)
 
         # Initialize data for the current university
         university_data = {
@@ -35,20 +109,19 @@ def check_character_counts():
         problem_files = []  # Track problematic files in this folder
 
         for txt_file in txt_files:
-            file_path = os.path.join(folder_path, txt_file)
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    char_count = len(content)
-
-                    # Update the max character count for this university
-                    if char_count > university_data["MaxCharacterCount"]:
-                        university_data["MaxCharacterCount"] = char_count
-
-                    # If file exceeds character limit, record it
-                    if char_count > CHARACTER_LIMIT:
-                        university_data["FilesOverLimit"] += 1
-                        problem_files.append(f"{txt_file} ({char_count} chars)")
+                with wave_source.open_source(wave3_path, folder_name, txt_file) as f:
+                    char_count, complete = count_stream_characters(
+                        f, None if exact_max_count else limit)
+
+                # Update the max character count for this university
+                if char_count > university_data["MaxCharacterCount"]:
+                    university_data["MaxCharacterCount"] = char_count
+
+                # If file exceeds character limit, record it
+                if char_count > limit:
+                    university_data["FilesOverLimit"] += 1
+                    problem_files.append(f"{txt_file} ({char_count if complete else f'>{limit}'} chars)")
             except Exception as e:
                 # Record the file as problematic if it can't be read
                 problem_files.append(f"{txt_file} (ERROR: {str(e)})")
@@ -79,7 +152,7 @@ def check_character_counts():
     flagged_count = sum(1 for uni in results if uni["Flagged"] == "YES")
     print(f"Character check completed. Results saved to: {check_results_path}")
     print(f"Total universities processed: {len(results)}")
-    print(f"Universities with files > {CHARACTER_LIMIT} chars: {flagged_count}")
+    print(f"Universities with files > {limit} chars: {flagged_count}")
 
 # Run the check if this script is executed directly
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+"""
+This script runs every output-CSV check in one go:
+
+    - Duplicate university codes            (Duplicates/check_duplicate_codes.py)
+    - Input folders vs CSV rows             (NumbersOfInput/verify_university_counts.py)
+    - .txt files vs UniversityLink columns  (SubfolderLink_vs_CSVLink_Matches/verify_link_counts.py)
+    - Missing / extra links                 (MissingLink/find_missing_links.py)
+
+The individual scripts each parse the whole CSV on their own. Here the CSV is read
+once and the input folder is walked once, and every check is fed from that shared
+pass. A combined report is printed and the exit code is 0 only if every check passed,
+so the runner can be used in a nightly job.
+
+csv_file may also point at the SQLite database written by main.py, or at a shard
+manifest, in which case the shards are scanned in parallel worker processes.
+"""
+
+import os
+import sys
+
+# Make the individual checks and the shared helpers in Common/ importable when this script is run directly
+_here = os.path.dirname(os.path.abspath(__file__))
+for _subfolder in ("Duplicates", "SubfolderLink_vs_CSVLink_Matches", "MissingLink", os.path.join("..", "Common")):
+    sys.path.insert(0, os.path.join(_here, _subfolder))
+
+from check_duplicate_codes import duplicate_codes
+from verify_link_counts import count_links
+from output_source import iter_output_rows, map_output_parts
+import wave_scanner
+
+# ===== Configuration =====
+csv_file = "../outputCvs/output_wave3_content_ordered.csv"
+base_dir = "/Users/helanwang/PycharmProjects/divHelan/Wave3/2021UniversityFiles"
+link_check_codes = ["msu"]  # Universities whose .txt files are matched to their UniversityLink columns one by one
+
+
+def scan_input_tree(base_dir):
+    """
+    Walk the input folder once (or reuse the snapshot saved earlier in this run).
+    Returns {code: sorted top-level .txt names} for every university folder.
+    """
+    snapshot = wave_scanner.get_snapshot(base_dir)
+    return {code: snapshot.txt_files(code) for code in snapshot.folder_names()}
+
+
+def scan_csv(csv_file, link_check_codes):
+    """
+    Read the CSV (or SQLite database, or every shard in parallel) once.
+    Returns (codes, link_counts, csv_links) where codes lists every Code in file order,
+    link_counts maps Code -> number of non-empty links, and csv_links maps each code in
+    link_check_codes to the names of its non-empty UniversityLink columns.
+    """
+    codes = []
+    link_counts = {}
+    csv_links = {}
+    for part_codes, part_counts, part_links in map_output_parts(csv_file, scan_csv_part, link_check_codes):
+        codes.extend(part_codes)
+        link_counts.update(part_counts)
+        csv_links.update(part_links)
+    return codes, link_counts, csv_links
+
+
+def scan_csv_part(csv_file, link_check_codes):
+    """
+    Read one part of the output (the whole CSV, or one shard).
+    Returns (codes, link_counts, csv_links) where codes lists every Code in file order,
+    link_counts maps Code -> number of non-empty links, and csv_links maps each code in
+    link_check_codes to the names of its non-empty UniversityLink columns.
+    """
+    codes = []
+    link_counts = {}
+    csv_links = {}
+    for row in iter_output_rows(csv_file):
+        code = row['Code']
+        codes.append(code)
+        link_counts[code] = count_links(row)
+        if code in link_check_codes:
+            csv_links[code] = {key for key in row.keys()
+                               if key.startswith("UniversityLink") and row[key] and row[key].strip()}
+    return codes, link_counts, csv_links
+
+
+def run_checks(csv_file, base_dir, link_check_codes=()):
+    """
+    Run every check from one CSV pass and one tree walk.
+    Returns a list of (check name, passed, detail lines).
+    """
+    folders = scan_input_tree(base_dir)
+    codes, link_counts, csv_links = scan_csv(csv_file, set(link_check_codes))
+    results = []
+
+    # 1. Duplicate codes
+    duplicates = duplicate_codes(codes)
+    results.append((
+        "Duplicate codes",
+        not duplicates,
+        [f"Duplicates: {', '.join(sorted(duplicates))}"] if duplicates else [],
+    ))
+
+    # 2. Number of input folders vs number of CSV rows
+    results.append((
+        "Input folders vs CSV rows",
+        len(folders) == len(codes),
+        [f"Input folders: {len(folders)}", f"CSV entries: {len(codes)}"],
+    ))
+
+    # 3. Non-empty links per row vs .txt files per folder
+    count_mismatches = [
+        (code, count, len(folders.get(code, ())))
+        for code, count in link_counts.items()
+        if count != len(folders.get(code, ()))
+    ]
+    results.append((
+        "Link counts vs .txt files",
+        not count_mismatches,
+        [f"- {code}: {csv_count} links (CSV) vs {txt_count} .txt files (folder)"
+         for code, csv_count, txt_count in count_mismatches],
+    ))
+
+    # 4. Missing / extra universities, plus a file-by-file check for selected codes: main.py writes
+    #    the folder's k-th .txt file (in name order) to UniversityLink{k}, so each file needs a filled
+    #    column and no other column may be filled. The cells hold page texts, not file names.
+    missing_rows = sorted(set(folders) - set(link_counts))
+    extra_rows = sorted(set(link_counts) - set(folders))
+    link_details = []
+    if missing_rows:
+        link_details.append(f"Folders missing in CSV: {', '.join(missing_rows)}")
+    if extra_rows:
+        link_details.append(f"CSV rows without a folder: {', '.join(extra_rows)}")
+    links_ok = not missing_rows and not extra_rows
+    for code in link_check_codes:
+        if code not in folders:
+            link_details.append(f"{code}: folder not found")
+            links_ok = False
+            continue
+        expected = {f"UniversityLink{i}": txt_file for i, txt_file in enumerate(folders[code], 1)}
+        filled = csv_links.get(code, set())
+        missing_in_csv = [txt_file for key, txt_file in expected.items() if key not in filled]
+        extra_in_csv = sorted((key for key in filled if key not in expected), key=lambda k: int(k[14:]))
+        if missing_in_csv:
+            link_details.append(f"{code}: missing in CSV: {missing_in_csv}")
+            links_ok = False
+        if extra_in_csv:
+            link_details.append(f"{code}: extra in CSV (no file for them): {extra_in_csv}")
+            links_ok = False
+    results.append(("Missing / extra links", links_ok, link_details))
+
+    return results
+
+
+def main():
+    results = run_checks(csv_file, base_dir, link_check_codes)
+
+    # Print one combined report
+    for name, passed, details in results:
+        print(f"{'✅' if passed else '❌'} {name}")
+        for line in details:
+            print(f"   {line}")
+
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        print(f"\n❌ **VERIFICATION FAILED**: {len(failed)} of {len(results)} checks failed")
+    else:
+        print(f"\n✅ **VERIFICATION PASSED**: all {len(results)} checks passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Checks that content_verification accepts an output written by main.py with boilerplate stripping.
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import contextlib
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for _folder in ("MainProgram", os.path.join("VerificationProgram", "ContentVerification")):
+    sys.path.insert(0, os.path.join(REPO_ROOT, _folder))
+
+import main
+import content_verification
+
+HEADER = "Skip to main content\nHome | Admissions | Research"
+FOOTER = "Copyright 2021 The University"
+
+
+def write_wave(wave_path):
+    """Two universities whose pages share a header and footer; one page is made only of boilerplate."""
+    pages = {
+        "alpha": ["Tuition and fees.", "Diversity   statement\n\n\nOur values.", "Campus map."],
+        "beta": ["Apply now.", "Financial aid.", ""],
+    }
+    for code, bodies in pages.items():
+        os.makedirs(os.path.join(wave_path, code))
+        for i, body in enumerate(bodies, 1):
+            with open(os.path.join(wave_path, code, f"{i}.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"{HEADER}\n\n{body}\n\n{FOOTER}\n")
+
+
+class StrippedOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.wave = os.path.join(self.tmp.name, "wave")
+        self.csv = os.path.join(self.tmp.name, "out.csv")
+        write_wave(self.wave)
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)  # Mismatch logs are written to the working directory
+        self.addCleanup(os.chdir, cwd)
+
+        self.set(main, wave3_path=self.wave, output_csv_path=self.csv, strip_boilerplate=True,
+                 boilerplate_wave_share=0.5)
+        self.set(content_verification, strip_boilerplate=True, boilerplate_wave_share=0.5)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            main.main()
+
+    def set(self, module, **settings):
+        """Change module settings for this test only."""
+        for name, value in settings.items():
+            self.addCleanup(setattr, module, name, getattr(module, name))
+            setattr(module, name, value)
+
+    def verify(self):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return content_verification.verify_existing(self.wave, self.csv, sample=False)
+
+    def test_stripped_output_verifies(self):
+        summary = self.verify()
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(summary["processed"], 2)
+
+    def test_unstripped_check_reports_the_stripped_pages(self):
+        content_verification.strip_boilerplate = False
+        self.assertGreater(self.verify()["errors"], 0)
+
+    def test_missing_wave_blocks(self):
+        os.remove(self.csv + ".boilerplate.json")
+        with self.assertRaises(ValueError):
+            self.verify()
+
+
+if __name__ == "__main__":
+    unittest.main()